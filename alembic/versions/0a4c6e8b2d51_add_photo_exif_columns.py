@@ -0,0 +1,72 @@
+"""add photos EXIF columns and capture-time indexes
+
+Revision ID: 0a4c6e8b2d51
+Revises: f1b3d5e7a924
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a4c6e8b2d51'
+down_revision = 'f1b3d5e7a924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("photos", sa.Column("taken_at", sa.DateTime(),
+                                      nullable=True))
+    op.add_column("photos", sa.Column("width", sa.Integer(),
+                                      nullable=True))
+    op.add_column("photos", sa.Column("height", sa.Integer(),
+                                      nullable=True))
+    op.add_column("photos", sa.Column("orientation", sa.SmallInteger(),
+                                      nullable=True))
+    op.add_column("photos", sa.Column("camera", sa.String(100),
+                                      nullable=True))
+
+    # Upload time until the backfill job has read each photo's EXIF;
+    # width stays NULL so the job knows what is left to do
+    op.execute("UPDATE photos SET taken_at = timestamp")
+    op.execute(
+        "UPDATE photos SET month_day = "
+        "EXTRACT(MONTH FROM taken_at) * 100 + EXTRACT(DAY FROM taken_at) "
+        "WHERE taken_at IS NOT NULL"
+    )
+
+    op.create_index(
+        "ix_photos_taken_order",
+        "photos",
+        [sa.text("taken_at DESC"), sa.text("id DESC")]
+    )
+    op.drop_index("ix_photos_month_day", table_name="photos")
+    op.create_index(
+        "ix_photos_month_day",
+        "photos",
+        ["month_day", sa.text("taken_at DESC"), sa.text("id DESC")]
+    )
+    op.create_index("ix_photos_camera", "photos", ["camera"])
+
+
+def downgrade():
+    op.drop_index("ix_photos_camera", table_name="photos")
+    op.drop_index("ix_photos_month_day", table_name="photos")
+    op.create_index(
+        "ix_photos_month_day",
+        "photos",
+        ["month_day", sa.text("timestamp DESC"), sa.text("id DESC")]
+    )
+    op.drop_index("ix_photos_taken_order", table_name="photos")
+    op.execute(
+        "UPDATE photos SET month_day = "
+        "EXTRACT(MONTH FROM timestamp) * 100 + EXTRACT(DAY FROM timestamp) "
+        "WHERE timestamp IS NOT NULL"
+    )
+    op.drop_column("photos", "camera")
+    op.drop_column("photos", "orientation")
+    op.drop_column("photos", "height")
+    op.drop_column("photos", "width")
+    op.drop_column("photos", "taken_at")
@@ -0,0 +1,37 @@
+"""add pending_deletions queue
+
+Revision ID: 2b7d9f1c3e65
+Revises: 0a4c6e8b2d51
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b7d9f1c3e65'
+down_revision = '0a4c6e8b2d51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "pending_deletions",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("attempts", sa.Integer(), server_default="0",
+                  nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(),
+                  server_default=sa.func.now(), nullable=False),
+        sa.Column("created_at", sa.DateTime(),
+                  server_default=sa.func.now())
+    )
+    op.create_index("ix_pending_deletions_next_attempt_at",
+                    "pending_deletions", ["next_attempt_at"])
+
+
+def downgrade():
+    op.drop_index("ix_pending_deletions_next_attempt_at",
+                  table_name="pending_deletions")
+    op.drop_table("pending_deletions")
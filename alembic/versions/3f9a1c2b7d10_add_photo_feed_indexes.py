@@ -0,0 +1,34 @@
+"""add photo feed keyset indexes
+
+Revision ID: 3f9a1c2b7d10
+Revises:
+Create Date: 2026-10-18 09:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_photos_feed_order",
+        "photos",
+        [sa.text("timestamp DESC"), sa.text("id DESC")]
+    )
+    op.create_index(
+        "ix_photos_uploader_feed_order",
+        "photos",
+        ["uploader_id", sa.text("timestamp DESC"), sa.text("id DESC")]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_photos_uploader_feed_order", table_name="photos")
+    op.drop_index("ix_photos_feed_order", table_name="photos")
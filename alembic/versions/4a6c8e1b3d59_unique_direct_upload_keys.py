@@ -0,0 +1,29 @@
+"""unique photos.minio_key for direct uploads
+
+Revision ID: 4a6c8e1b3d59
+Revises: 9d1f3b5a7c28
+Create Date: 2026-10-18 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a6c8e1b3d59'
+down_revision = '9d1f3b5a7c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Content-addressed keys are shared between photos, only direct
+    # upload keys must be unique
+    direct = sa.text("minio_key LIKE 'direct/%'")
+    op.create_index("uq_photos_direct_key", "photos", ["minio_key"],
+                    unique=True, postgresql_where=direct,
+                    sqlite_where=direct)
+
+
+def downgrade():
+    op.drop_index("uq_photos_direct_key", table_name="photos")
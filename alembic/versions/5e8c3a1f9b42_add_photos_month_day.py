@@ -0,0 +1,36 @@
+"""add photos.month_day for on-this-day lookups
+
+Revision ID: 5e8c3a1f9b42
+Revises: c41d7e9a2f58
+Create Date: 2026-10-18 13:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8c3a1f9b42'
+down_revision = 'c41d7e9a2f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("photos",
+                  sa.Column("month_day", sa.SmallInteger(), nullable=True))
+    op.execute(
+        "UPDATE photos SET month_day = "
+        "EXTRACT(MONTH FROM timestamp) * 100 + EXTRACT(DAY FROM timestamp) "
+        "WHERE timestamp IS NOT NULL"
+    )
+    op.create_index(
+        "ix_photos_month_day",
+        "photos",
+        ["month_day", sa.text("timestamp DESC"), sa.text("id DESC")]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_photos_month_day", table_name="photos")
+    op.drop_column("photos", "month_day")
@@ -0,0 +1,64 @@
+"""add photo_search full-text index
+
+Revision ID: 6c8e0a2f4b17
+Revises: 2b7d9f1c3e65
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '6c8e0a2f4b17'
+down_revision = '2b7d9f1c3e65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_table(
+        "photo_search",
+        sa.Column("photo_id", sa.Integer(),
+                  sa.ForeignKey("photos.id", ondelete="CASCADE"),
+                  primary_key=True),
+        sa.Column("document", sa.Text(), nullable=False),
+        sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True)
+    )
+
+    # Same text and weights as app.core.search.refresh_search
+    op.execute("""
+        INSERT INTO photo_search (photo_id, document, search_vector)
+        SELECT p.id,
+               concat_ws(E'\\n', NULLIF(p.caption, ''),
+                         NULLIF(a.title, ''), c.comments),
+               setweight(to_tsvector('english',
+                                     coalesce(p.caption, '')), 'A') ||
+               setweight(to_tsvector('english',
+                                     coalesce(a.title, '')), 'B') ||
+               setweight(to_tsvector('english',
+                                     coalesce(c.comments, '')), 'C')
+        FROM photos p
+        LEFT JOIN albums a ON a.id = p.album_id
+        LEFT JOIN (
+            SELECT photo_id, string_agg(text, E'\\n' ORDER BY id)
+                AS comments
+            FROM photo_comments
+            GROUP BY photo_id
+        ) c ON c.photo_id = p.id
+    """)
+
+    op.create_index("ix_photo_search_vector", "photo_search",
+                    ["search_vector"], postgresql_using="gin")
+    op.create_index("ix_photo_search_document_trgm", "photo_search",
+                    ["document"], postgresql_using="gin",
+                    postgresql_ops={"document": "gin_trgm_ops"})
+
+
+def downgrade():
+    op.drop_index("ix_photo_search_document_trgm",
+                  table_name="photo_search")
+    op.drop_index("ix_photo_search_vector", table_name="photo_search")
+    op.drop_table("photo_search")
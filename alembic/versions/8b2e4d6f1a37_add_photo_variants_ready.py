@@ -0,0 +1,28 @@
+"""add photos.variants_ready
+
+Revision ID: 8b2e4d6f1a37
+Revises: 3f9a1c2b7d10
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a37'
+down_revision = '3f9a1c2b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "photos",
+        sa.Column("variants_ready", sa.Boolean(),
+                  server_default=sa.false(), nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_column("photos", "variants_ready")
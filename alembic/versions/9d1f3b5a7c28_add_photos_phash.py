@@ -0,0 +1,26 @@
+"""add photos.phash perceptual hash
+
+Revision ID: 9d1f3b5a7c28
+Revises: 6c8e0a2f4b17
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d1f3b5a7c28'
+down_revision = '6c8e0a2f4b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled for existing photos by `python -m app.core.duplicates`
+    op.add_column("photos", sa.Column("phash", sa.BigInteger(),
+                                      nullable=True))
+
+
+def downgrade():
+    op.drop_column("photos", "phash")
@@ -0,0 +1,49 @@
+"""add albums.photo_count and albums.cover_photo_id
+
+Revision ID: a7d2f4c8e913
+Revises: 5e8c3a1f9b42
+Create Date: 2026-10-18 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d2f4c8e913'
+down_revision = '5e8c3a1f9b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "albums",
+        sa.Column("photo_count", sa.Integer(),
+                  server_default="0", nullable=False)
+    )
+    op.add_column(
+        "albums",
+        sa.Column("cover_photo_id", sa.Integer(), nullable=True)
+    )
+    op.create_foreign_key(
+        "albums_cover_photo_id_fkey",
+        "albums", "photos",
+        ["cover_photo_id"], ["id"],
+        ondelete="SET NULL"
+    )
+    # Backfill from the existing photos; the oldest photo is the cover
+    op.execute(
+        "UPDATE albums SET "
+        "photo_count = (SELECT count(*) FROM photos "
+        "               WHERE photos.album_id = albums.id), "
+        "cover_photo_id = (SELECT min(id) FROM photos "
+        "                  WHERE photos.album_id = albums.id)"
+    )
+
+
+def downgrade():
+    op.drop_constraint("albums_cover_photo_id_fkey", "albums",
+                       type_="foreignkey")
+    op.drop_column("albums", "cover_photo_id")
+    op.drop_column("albums", "photo_count")
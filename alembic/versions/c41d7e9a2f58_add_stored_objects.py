@@ -0,0 +1,33 @@
+"""add stored_objects for content-addressed storage
+
+Revision ID: c41d7e9a2f58
+Revises: 8b2e4d6f1a37
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d7e9a2f58'
+down_revision = '8b2e4d6f1a37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stored_objects",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(),
+                  server_default=sa.func.now()),
+        sa.UniqueConstraint("sha256")
+    )
+
+
+def downgrade():
+    op.drop_table("stored_objects")
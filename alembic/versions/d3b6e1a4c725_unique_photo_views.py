@@ -0,0 +1,33 @@
+"""unique (photo_id, user_id) on photo_views
+
+Revision ID: d3b6e1a4c725
+Revises: a7d2f4c8e913
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b6e1a4c725'
+down_revision = 'a7d2f4c8e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the earliest view per viewer before enforcing uniqueness
+    op.execute(
+        "DELETE FROM photo_views a USING photo_views b "
+        "WHERE a.photo_id = b.photo_id "
+        "AND a.user_id = b.user_id "
+        "AND a.id > b.id"
+    )
+    op.create_unique_constraint("uq_photo_views_photo_user",
+                                "photo_views",
+                                ["photo_id", "user_id"])
+
+
+def downgrade():
+    op.drop_constraint("uq_photo_views_photo_user", "photo_views",
+                       type_="unique")
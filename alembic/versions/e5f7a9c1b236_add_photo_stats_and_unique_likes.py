@@ -0,0 +1,57 @@
+"""add photo_stats counters and unique photo_likes
+
+Revision ID: e5f7a9c1b236
+Revises: d3b6e1a4c725
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f7a9c1b236'
+down_revision = 'd3b6e1a4c725'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Double taps may already have left duplicate likes behind
+    op.execute(
+        "DELETE FROM photo_likes a USING photo_likes b "
+        "WHERE a.photo_id = b.photo_id "
+        "AND a.user_id = b.user_id "
+        "AND a.id > b.id"
+    )
+    op.create_unique_constraint("uq_photo_likes_photo_user",
+                                "photo_likes",
+                                ["photo_id", "user_id"])
+
+    op.create_table(
+        "photo_stats",
+        sa.Column("photo_id", sa.Integer(),
+                  sa.ForeignKey("photos.id", ondelete="CASCADE"),
+                  primary_key=True),
+        sa.Column("likes", sa.Integer(), server_default="0",
+                  nullable=False),
+        sa.Column("comments", sa.Integer(), server_default="0",
+                  nullable=False),
+        sa.Column("views", sa.Integer(), server_default="0",
+                  nullable=False)
+    )
+    op.execute(
+        "INSERT INTO photo_stats (photo_id, likes, comments, views) "
+        "SELECT p.id, "
+        "  (SELECT count(*) FROM photo_likes l WHERE l.photo_id = p.id), "
+        "  (SELECT count(*) FROM photo_comments c "
+        "   WHERE c.photo_id = p.id), "
+        "  (SELECT count(*) FROM photo_views v WHERE v.photo_id = p.id) "
+        "FROM photos p"
+    )
+
+
+def downgrade():
+    op.drop_table("photo_stats")
+    op.drop_constraint("uq_photo_likes_photo_user", "photo_likes",
+                       type_="unique")
@@ -0,0 +1,27 @@
+"""add photo_comments (photo_id, timestamp, id) index
+
+Revision ID: f1b3d5e7a924
+Revises: e5f7a9c1b236
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b3d5e7a924'
+down_revision = 'e5f7a9c1b236'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_photo_comments_thread",
+        "photo_comments",
+        ["photo_id", "timestamp", "id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_photo_comments_thread", table_name="photo_comments")
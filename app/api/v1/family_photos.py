@@ -1,19 +1,53 @@
 from fastapi import (APIRouter, UploadFile, File, Depends,
-                     HTTPException, Form)
-from sqlalchemy import extract
-from sqlalchemy.orm import Session
+                     HTTPException, Form, BackgroundTasks, Body,
+                     Query, Request)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from app.database.database import get_db
-from app.core.storage import (upload_image_to_storage, get_image_url,
-                              minio_client, BUCKET_NAME)
-from app.models.photo_model import Photo, Like, Comment, View, Album
+from app.core.storage import (get_image_url, async_storage,
+                              get_presigned_upload_url,
+                              get_direct_image_url, get_backend,
+                              ObjectNotFound)
+from app.core.image_cache import (image_cache, file_headers,
+                                  PinnedFileResponse)
+from app.core.photo_feed import (fetch_recent_comments,
+                                 comment_thread_page,
+                                 paginate_by_keyset,
+                                 on_this_day_page,
+                                 invalidate_on_this_day)
+from app.core.derivatives import generate_derivatives, photo_urls
+from app.core.content_store import store_content, release_content
+from app.core.photo_metadata import read_metadata, read_stored_metadata
+from app.core.albums import add_to_album, move_photo
+from app.core.deletions import (delete_photos, drain_deletions,
+                                enqueue_deletions)
+from app.core.view_buffer import record_views
+from app.core.photo_stats import bump_stats, toggle_like
+from app.core.search import refresh_search, search_photos
+from app.core.duplicates import duplicate_groups, PHASH_MAX_DISTANCE
+from app.core.album_export import album_entries, stream_zip
+from app.core.events import (event_bus, publish, format_event,
+                             EVENTS_KEEPALIVE_SECONDS)
+from app.core import response_cache
+from app.core.response_cache import PHOTOS, ALBUMS, USERS, DUPLICATES
+from app.core.passwords import (hash_password, verify_password,
+                                PasswordPoolBusy)
+from app.core.user_cache import (UserPrincipal, get_principal,
+                                 invalidate_user)
+from app.models.photo_model import Photo, Comment, Album
 from app.models.user_models import User
+import re
 import uuid
+import asyncio
 import logging
 import os
+from typing import List
 from jose import jwt, JWTError
-from passlib.context import CryptContext
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, time, timedelta, timezone
+from fastapi.responses import (FileResponse, RedirectResponse, Response,
+                               StreamingResponse)
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 
 logger = logging.getLogger("app.api.users")
 family_photos_router = APIRouter()
@@ -21,27 +55,56 @@ family_photos_router = APIRouter()
 # Load from your .env
 SECRET_KEY = os.getenv("SECRET_KEY", "your-default-secret")
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Objects uploaded straight to the bucket land under this prefix
+DIRECT_UPLOAD_PREFIX = "direct"
+# /feed sort orders: upload time or EXIF capture time
+FEED_SORT_COLUMNS = {"uploaded": Photo.timestamp, "taken": Photo.taken_at}
+# Concurrent storage writes per /upload/batch request
+BATCH_UPLOAD_PARALLELISM = int(os.getenv("BATCH_UPLOAD_PARALLELISM", "4"))
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
 
 # Utilities
-def hash_pw(pw):
-    return pwd_context.hash(pw)
+def _password_busy():
+    return HTTPException(status_code=503,
+                         detail="Server busy, try again shortly",
+                         headers={"Retry-After": "1"})
 
 
-def verify_pw(pw, hashed):
-    return pwd_context.verify(pw, hashed)
+async def hash_pw(pw):
+    # bcrypt runs on its own process pool, see app.core.passwords
+    try:
+        return await hash_password(pw)
+    except PasswordPoolBusy:
+        raise _password_busy()
+
+
+async def verify_pw(pw, hashed):
+    try:
+        return await verify_password(pw, hashed)
+    except PasswordPoolBusy:
+        raise _password_busy()
+
 
+def format_photo_list(photos, db: Session):
+    # Comment previews are fetched for the whole page at once, so the
+    # number of queries does not grow with the page size. Uploaders and
+    # counters must already be eager-loaded (see `_photo_query`).
+    recent = fetch_recent_comments(db, [p.id for p in photos])
 
-def format_photo_list(photos):
     data = []
     for p in photos:
         data.append({
             "id": p.id,
             "url": get_image_url(p.minio_key),
+            "urls": photo_urls(p.minio_key, p.variants_ready),
             "caption": p.caption,
             "timestamp": p.timestamp,
+            "taken_at": p.taken_at,
+            "width": p.width or None,
+            "height": p.height or None,
+            "orientation": p.orientation,
+            "camera": p.camera,
             "uploader": {
                 "id": p.uploader.id,
                 "display_name": p.uploader.display_name or p.uploader.username,
@@ -50,18 +113,21 @@ def format_photo_list(photos):
                 p.uploader.profile_photo_key else None
             },
             "stats": {
-                "likes": len(p.likes),
-                "comments": len(p.comments),
-                "views": len(p.views)
+                "likes": p.stats.likes if p.stats else 0,
+                "comments": p.stats.comments if p.stats else 0,
+                "views": p.stats.views if p.stats else 0
             },
-            "recent_comments": [
-                {"username": c.user.username, "text": c.text}
-                for c in p.comments[-3:]
-            ]
+            "recent_comments": recent.get(p.id, [])
         })
     return data
 
 
+def _photo_query(db: Session):
+    """Base photo query with uploader and counters in the same SELECT."""
+    return db.query(Photo).options(joinedload(Photo.uploader),
+                                   joinedload(Photo.stats))
+
+
 # JWT Dependency to protect routes
 def get_current_user(token: str = Depends(oauth2_scheme),
                      db: Session = Depends(get_db)):
@@ -78,7 +144,8 @@ def get_current_user(token: str = Depends(oauth2_scheme),
         raise HTTPException(status_code=401,
                             detail="Could not validate credentials")
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    # Cached, so most protected requests never query the users table
+    user = get_principal(db, int(user_id))
 
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
@@ -86,6 +153,14 @@ def get_current_user(token: str = Depends(oauth2_scheme),
     return user
 
 
+def get_parent_user(current_user: UserPrincipal = Depends(get_current_user)):
+    # Admin routes: maintenance and operational stats
+    if current_user.role != "parent":
+        raise HTTPException(status_code=403,
+                            detail="Only parents can access this")
+    return current_user
+
+
 def get_current_user_for_refresh(
         token: str = Depends(oauth2_scheme),
         db: Session = Depends(get_db)):
@@ -115,8 +190,9 @@ def get_current_user_for_refresh(
 
 
 @family_photos_router.post("/login")
-def login(data: dict, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == data.get('user_id')).first()
+async def login(data: dict, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.id == data.get('user_id')).first())
     if not user:
         raise HTTPException(status_code=404)
 
@@ -125,7 +201,7 @@ def login(data: dict, db: Session = Depends(get_db)):
         return {"status": "needs_initial_password"}
 
     # 2. Verify password
-    if not verify_pw(data.get('password'), user.hashed_password):
+    if not await verify_pw(data.get('password'), user.hashed_password):
         raise HTTPException(status_code=401,
                             detail="Invalid password")
 
@@ -142,134 +218,582 @@ def login(data: dict, db: Session = Depends(get_db)):
 
 
 @family_photos_router.post("/users/set-password")
-def set_password(data: dict, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == data.get('user_id')).first()
+async def set_password(data: dict, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.id == data.get('user_id')).first())
     if user and user.hashed_password is None:
-        user.hashed_password = hash_pw(data.get('password'))
-        db.commit()
+        user.hashed_password = await hash_pw(data.get('password'))
+        await run_in_threadpool(db.commit)
         return {"status": "success"}
     raise HTTPException(
         status_code=400,
         detail="Password already set or user not found")
 
 
-@family_photos_router.post("/upload")
-def upload_photo(
-        caption: str = Form(None),
-        album_id: int = Form(None),
-        file: UploadFile = File(...),
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
-):
-    file_ext = file.filename.split(".")[-1]
-    minio_key = f"{uuid.uuid4()}.{file_ext}"
-
-    minio_client.put_object(
-        "family-photos",
-        minio_key,
-        file.file,
-        length=-1,
-        part_size=10 * 1024 * 1024
-    )
+def _add_photo(db: Session,
+               minio_key: str,
+               is_new: bool,
+               caption: str,
+               uploader_id: int,
+               album_id: int = None,
+               metadata: dict = None) -> Photo:
+    """
+    Adds (and flushes) a Photo row for a stored object; caller commits.
+    `metadata` holds the EXIF columns from `read_metadata`.
+    """
+    # A reused object may already have had its derivatives rendered
+    # and its perceptual hash computed
+    processed = None if is_new else db.query(Photo.phash).filter(
+        Photo.minio_key == minio_key,
+        Photo.variants_ready.is_(True)).first()
 
     new_photo = Photo(
         minio_key=minio_key,
         caption=caption,
-        uploader_id=current_user.id,
+        uploader_id=uploader_id,
         album_id=album_id,
-        timestamp=datetime.now(timezone.utc)
+        timestamp=datetime.now(timezone.utc),
+        variants_ready=processed is not None,
+        phash=processed.phash if processed else None,
+        **(metadata or {})
     )
     db.add(new_photo)
+    db.flush()
+    add_to_album(db, album_id, new_photo.id)
+    refresh_search(db, [new_photo.id])
+    publish(db, "photo_added", photo_id=new_photo.id, album_id=album_id,
+            uploader_id=uploader_id)
+    return new_photo
+
+
+def _is_backdated(metadata: dict) -> bool:
+    """Whether a capture time puts a new photo on an earlier date."""
+    taken_at = (metadata or {}).get("taken_at")
+    return taken_at is not None and \
+        taken_at.date() < datetime.now(timezone.utc).date()
+
+
+def _commit(db: Session, obj=None):
     db.commit()
+    if obj is not None:
+        db.refresh(obj)
+
+
+@family_photos_router.post("/upload")
+async def upload_photo(
+        background_tasks: BackgroundTasks,
+        caption: str = Form(None),
+        album_id: int = Form(None),
+        file: UploadFile = File(...),
+        db: Session = Depends(get_db),
+        current_user: UserPrincipal = Depends(get_current_user)
+):
+    file_ext = file.filename.split(".")[-1]
+
+    # EXIF comes from the first few hundred KiB only
+    metadata = await run_in_threadpool(read_metadata, file.file)
+
+    # Identical bytes are stored once and shared between photos
+    minio_key, is_new = await store_content(db,
+                                            file.file,
+                                            file_ext,
+                                            file.content_type or "image/jpeg")
+
+    new_photo = await run_in_threadpool(_add_photo, db, minio_key, is_new,
+                                        caption, current_user.id, album_id,
+                                        metadata)
+    photo_id, variants_ready = new_photo.id, new_photo.variants_ready
+    await run_in_threadpool(_commit, db)
+    response_cache.invalidate(PHOTOS, ALBUMS, DUPLICATES)
+    if _is_backdated(metadata):
+        invalidate_on_this_day()
+
+    # Thumbnails are rendered after the response has been sent
+    if not variants_ready:
+        background_tasks.add_task(generate_derivatives,
+                                  photo_id, minio_key)
 
     return {"message": "Success"}
 
 
+@family_photos_router.post("/views")
+def record_views_bulk(
+        photo_ids: List[int] = Body(..., embed=True, max_length=500),
+        current_user: UserPrincipal = Depends(get_current_user)):
+    # Everything seen on one screen, reported in a single request
+    record_views(photo_ids, current_user.id)
+    return {"status": "views_recorded", "count": len(photo_ids)}
+
+
+@family_photos_router.post("/upload/batch")
+async def upload_batch(
+        background_tasks: BackgroundTasks,
+        files: List[UploadFile] = File(...),
+        caption: str = Form(None),
+        album_id: int = Form(None),
+        db: Session = Depends(get_db),
+        current_user: UserPrincipal = Depends(get_current_user)
+):
+    semaphore = asyncio.Semaphore(BATCH_UPLOAD_PARALLELISM)
+    db_lock = asyncio.Lock()
+
+    async def store_one(file: UploadFile):
+        async with semaphore:
+            try:
+                metadata = await run_in_threadpool(read_metadata, file.file)
+                key, is_new = await store_content(
+                    db,
+                    file.file,
+                    file.filename.split(".")[-1],
+                    file.content_type or "image/jpeg",
+                    db_lock=db_lock)
+                return {"filename": file.filename,
+                        "key": key,
+                        "is_new": is_new,
+                        "metadata": metadata}
+            except Exception as e:
+                logger.error(f"Batch upload of {file.filename} failed: {e}")
+                return {"filename": file.filename,
+                        "error": "Storage upload failed"}
+
+    # 1. Write every file to storage, a few at a time
+    stored = await asyncio.gather(*(store_one(f) for f in files))
+
+    # 2. Insert all the Photo rows in a single transaction
+    def insert_photos():
+        for item in stored:
+            if "key" in item:
+                photo = _add_photo(db, item["key"], item["is_new"],
+                                   caption, current_user.id, album_id,
+                                   item["metadata"])
+                item["photo"] = (photo.id, photo.variants_ready)
+        db.commit()
+
+    try:
+        await run_in_threadpool(insert_photos)
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        logger.error(f"Batch upload commit failed: {e}")
+        raise HTTPException(status_code=500,
+                            detail="Database update failed")
+    response_cache.invalidate(PHOTOS, ALBUMS, DUPLICATES)
+    if any(_is_backdated(item.get("metadata")) for item in stored):
+        invalidate_on_this_day()
+
+    # 3. Per-file report, derivatives rendered after the response
+    results = []
+    for item in stored:
+        if "photo" not in item:
+            results.append({"filename": item["filename"],
+                            "status": "failed",
+                            "detail": item["error"]})
+            continue
+        photo_id, variants_ready = item["photo"]
+        if not variants_ready:
+            background_tasks.add_task(generate_derivatives,
+                                      photo_id, item["key"])
+        results.append({"filename": item["filename"],
+                        "status": "uploaded",
+                        "photo_id": photo_id})
+
+    return {
+        "uploaded": sum(r["status"] == "uploaded" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "results": results
+    }
+
+
+@family_photos_router.post("/upload/presign")
+def presign_upload(
+        filename: str = Form(...),
+        current_user: UserPrincipal = Depends(get_current_user)
+):
+    # Step 1 of a direct upload: hand out a URL to PUT the bytes to
+    file_ext = filename.split(".")[-1]
+    key = f"{DIRECT_UPLOAD_PREFIX}/{current_user.id}/{uuid.uuid4()}.{file_ext}"
+    try:
+        upload_url = get_presigned_upload_url(key)
+    except NotImplementedError:
+        raise HTTPException(status_code=501,
+                            detail="Direct uploads are not supported "
+                                   "by this storage backend")
+    return {
+        "key": key,
+        "method": "PUT",
+        "upload_url": upload_url
+    }
+
+
+@family_photos_router.post("/upload/commit")
+async def commit_upload(
+        background_tasks: BackgroundTasks,
+        key: str = Form(...),
+        caption: str = Form(None),
+        album_id: int = Form(None),
+        db: Session = Depends(get_db),
+        current_user: UserPrincipal = Depends(get_current_user)
+):
+    # Step 2: the bytes are in the bucket, register the photo.
+    # Direct uploads skip content hashing, so they are not deduplicated.
+    if not key.startswith(f"{DIRECT_UPLOAD_PREFIX}/{current_user.id}/"):
+        raise HTTPException(status_code=403,
+                            detail="Key was not issued to this user")
+
+    try:
+        await async_storage.stat_object(key)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404,
+                            detail="Uploaded object not found")
+
+    # Only the header is fetched; on failure the backfill job retries
+    try:
+        metadata = await async_storage.run(read_stored_metadata, key)
+    except Exception as e:
+        logger.error(f"Metadata read failed for {key}: {e}")
+        metadata = None
+
+    # The unique index on direct keys makes a second commit of the same
+    # key fail, even when both requests arrive at once
+    try:
+        new_photo = await run_in_threadpool(_add_photo, db, key, True,
+                                            caption, current_user.id,
+                                            album_id, metadata)
+        photo_id = new_photo.id
+        await run_in_threadpool(_commit, db)
+    except IntegrityError:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=409,
+                            detail="Upload already committed")
+    response_cache.invalidate(PHOTOS, ALBUMS, DUPLICATES)
+    if _is_backdated(metadata):
+        invalidate_on_this_day()
+
+    background_tasks.add_task(generate_derivatives, photo_id, key)
+
+    return {"message": "Success", "photo_id": photo_id}
+
+
+@family_photos_router.get("/images/{key:path}")
+async def get_image(key: str, request: Request):
+    # Optional front for MinIO (see IMAGE_PROXY_URL): hot objects are
+    # served from the local disk cache with Range and ETag support.
+    # The local backend's files are served directly.
+    try:
+        path = get_backend().local_path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if path is not None:
+        media_type, headers = file_headers(key, path)
+        if headers["ETag"] in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    # Pinned, so an eviction cannot remove the file while it is sent
+    path = image_cache.get(key, pin=True)
+    if path is None:
+        try:
+            path = await async_storage.run(image_cache.fetch, key, True)
+        except ObjectNotFound:
+            raise HTTPException(status_code=404, detail="Image not found")
+    if path is None:
+        # Larger than the whole cache, let MinIO serve it
+        return RedirectResponse(get_direct_image_url(key))
+
+    try:
+        media_type, headers = file_headers(key, path)
+    except BaseException:
+        image_cache.release(path)
+        raise
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        image_cache.release(path)
+        return Response(status_code=304, headers=headers)
+    return PinnedFileResponse(image_cache, path, media_type=media_type,
+                              headers=headers)
+
+
+@family_photos_router.get("/events")
+async def event_stream(request: Request):
+    # Server-sent events: uploads, likes, comments and deletes as small
+    # JSON messages, so clients patch their state instead of polling
+    subscription = event_bus.subscribe()
+    _, queue = subscription
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(
+                        queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(payload)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(stream(),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache",
+                                      "X-Accel-Buffering": "no"})
+
+
 @family_photos_router.get("/feed")
 def get_feed(
+        request: Request,
         user_id: int = None,
         limit: int = 20,
-        offset: int = 0,
+        cursor: str = None,
+        sort: str = "uploaded",
+        taken_from: date = None,
+        taken_to: date = None,
         db: Session = Depends(get_db)):
+    if sort not in FEED_SORT_COLUMNS:
+        raise HTTPException(status_code=400,
+                            detail="sort must be 'uploaded' or 'taken'")
+
+    # 0. Serve from the response cache (or 304) before any DB work
+    key = response_cache.cache_key(PHOTOS, request)
+    hit = response_cache.cached(key, request)
+    if hit:
+        return hit
+
     # 1. Start with the base query
-    query = db.query(Photo)
+    query = _photo_query(db)
 
     # 2. If a user_id is provided, filter the photos by that uploader
     if user_id:
         query = query.filter(Photo.uploader_id == user_id)
 
-    # 3. Apply ordering and pagination
-    photos = query.order_by(
-        Photo.timestamp.desc()).limit(limit).offset(offset).all()
+    # 3. Optional capture date range, inclusive of both days
+    if taken_from:
+        query = query.filter(
+            Photo.taken_at >= datetime.combine(taken_from, time.min))
+    if taken_to:
+        query = query.filter(Photo.taken_at < datetime.combine(
+            taken_to + timedelta(days=1), time.min))
 
-    return format_photo_list(photos)
+    # 4. Seek past the cursor (newest first) instead of using OFFSET
+    try:
+        photos, next_cursor = paginate_by_keyset(
+            query, limit, cursor, order_by=FEED_SORT_COLUMNS[sort])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return response_cache.store(key, request, {
+        "photos": format_photo_list(photos, db),
+        "next_cursor": next_cursor
+    })
 
 
 @family_photos_router.get("/historical")
-def on_this_day(db: Session = Depends(get_db)):
+def on_this_day(
+        request: Request,
+        limit: int = 20,
+        cursor: str = None,
+        db: Session = Depends(get_db)):
     today = datetime.now(timezone.utc).date()
 
-    # Filter photos where Month and Day match today, but
-    # Year is strictly less than current year
-    query = db.query(Photo).filter(
-        extract('month', Photo.timestamp) == today.month,
-        extract('day', Photo.timestamp) == today.day,
-        extract('year', Photo.timestamp) < today.year
-    )
+    key = response_cache.cache_key(PHOTOS, request, vary=today.isoformat())
+    hit = response_cache.cached(key, request)
+    if hit:
+        return hit
+
+    # Photos whose month and day match today from earlier years, most
+    # recent years first. The id list is cached until midnight.
+    try:
+        photo_ids, next_cursor = on_this_day_page(db, today, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    by_id = {p.id: p for p in _photo_query(db).filter(
+        Photo.id.in_(photo_ids))} if photo_ids else {}
+    photos = [by_id[i] for i in photo_ids if i in by_id]
 
-    # Order by most recent years first (e.g., 1 year ago, then 2 years ago)
-    photos = query.order_by(Photo.timestamp.desc()).all()
+    return response_cache.store(key, request, {
+        "photos": format_photo_list(photos, db),
+        "next_cursor": next_cursor
+    })
 
-    return format_photo_list(photos)
+
+@family_photos_router.get("/search")
+def search(
+        request: Request,
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = 20,
+        cursor: str = None,
+        db: Session = Depends(get_db)):
+    key = response_cache.cache_key(PHOTOS, request)
+    hit = response_cache.cached(key, request)
+    if hit:
+        return hit
+
+    # Captions, album titles and comments, best match first
+    try:
+        photo_ids, next_cursor = search_photos(db, q, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    by_id = {p.id: p for p in _photo_query(db).filter(
+        Photo.id.in_(photo_ids))} if photo_ids else {}
+    photos = [by_id[i] for i in photo_ids if i in by_id]
+
+    return response_cache.store(key, request, {
+        "photos": format_photo_list(photos, db),
+        "next_cursor": next_cursor
+    })
+
+
+@family_photos_router.get("/duplicates")
+def get_duplicates(
+        request: Request,
+        max_distance: int = Query(PHASH_MAX_DISTANCE, ge=0, le=16),
+        limit: int = 20,
+        cursor: str = None,
+        db: Session = Depends(get_db)):
+    key = response_cache.cache_key(PHOTOS, request)
+    hit = response_cache.cached(key, request)
+    if hit:
+        return hit
+
+    # Groups of near-identical photos by perceptual hash, largest first
+    try:
+        offset = int(cursor) if cursor else 0
+        if offset < 0:
+            raise ValueError(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    groups = duplicate_groups(db, max_distance)
+    page = groups[offset:offset + limit]
+    next_cursor = str(offset + limit) if len(groups) > offset + limit \
+        else None
+
+    # One formatting pass for every photo on the page
+    photo_ids = [i for group in page for i in group]
+    by_id = {p.id: p for p in _photo_query(db).filter(
+        Photo.id.in_(photo_ids))} if photo_ids else {}
+    formatted = {p["id"]: p for p in format_photo_list(
+        [by_id[i] for i in photo_ids if i in by_id], db)}
+
+    return response_cache.store(key, request, {
+        "groups": [[formatted[i] for i in group if i in formatted]
+                   for group in page],
+        "next_cursor": next_cursor
+    })
 
 
 @family_photos_router.post("/{photo_id}/like")
 def like_photo(
         photo_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: UserPrincipal = Depends(get_current_user)
 ):
-    # Toggle logic using current_user.id
-    like = db.query(Like).filter_by(photo_id=photo_id,
-                                    user_id=current_user.id).first()
-    if like:
-        db.delete(like)
-    else:
-        db.add(Like(photo_id=photo_id, user_id=current_user.id))
+    # Atomic toggle; the like counter moves in the same transaction
+    try:
+        liked = toggle_like(db, photo_id, current_user.id)
+    except LookupError:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Photo not found")
+    publish(db, "like", photo_id=photo_id, user_id=current_user.id,
+            liked=liked)
     db.commit()
-    return {"status": "updated"}
+    response_cache.invalidate(PHOTOS)
+    return {"status": "updated", "liked": liked}
+
+
+def _can_delete(photo: Photo, current_user: UserPrincipal) -> bool:
+    # Only the uploader or a 'parent' can delete
+    return photo.uploader_id == current_user.id or \
+        current_user.role == "parent"
+
+
+def _delete_and_commit(db: Session, photos: List[Photo]):
+    try:
+        delete_photos(db, photos)
+        publish(db, "photos_deleted", photo_ids=[p.id for p in photos])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Delete failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cleanup failed")
+    response_cache.invalidate(PHOTOS, ALBUMS, DUPLICATES)
 
 
 @family_photos_router.delete("/{photo_id}")
 def delete_photo(
         photo_id: int,
+        background_tasks: BackgroundTasks,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)):
+        current_user: UserPrincipal = Depends(get_current_user)):
     photo = db.query(Photo).filter(Photo.id == photo_id).first()
+    if not photo:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    if not _can_delete(photo, current_user):
+        raise HTTPException(
+            status_code=403,
+            detail="Not authorized to delete this photo"
+        )
+
+    # Storage objects are queued and removed after the response
+    _delete_and_commit(db, [photo])
+    background_tasks.add_task(drain_deletions)
 
+    return {"status": "success", "message": "Photo and file deleted"}
+
+
+@family_photos_router.post("/bulk-delete")
+def delete_photos_bulk(
+        background_tasks: BackgroundTasks,
+        photo_ids: List[int] = Body(..., embed=True, max_length=500),
+        db: Session = Depends(get_db),
+        current_user: UserPrincipal = Depends(get_current_user)):
+    # All rows go in one transaction; storage keys are queued and
+    # removed in batches by the deletion worker
+    photos = db.query(Photo).filter(Photo.id.in_(photo_ids)).all()
+    allowed = [p for p in photos if _can_delete(p, current_user)]
+    found = {p.id for p in photos}
+    deleted = [p.id for p in allowed]
+
+    if allowed:
+        _delete_and_commit(db, allowed)
+        background_tasks.add_task(drain_deletions)
+
+    return {
+        "deleted": deleted,
+        "not_found": [i for i in photo_ids if i not in found],
+        "forbidden": [p.id for p in photos
+                      if not _can_delete(p, current_user)]
+    }
+
+
+@family_photos_router.patch("/{photo_id}/album")
+def reassign_album(
+        photo_id: int,
+        album_id: int = Form(None),
+        db: Session = Depends(get_db),
+        current_user: UserPrincipal = Depends(get_current_user)):
+    photo = db.query(Photo).filter(Photo.id == photo_id).first()
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
 
-    # Permission Check: Only the uploader or a 'parent' can delete
-    # We now trust current_user.id from the token
     if photo.uploader_id != current_user.id and current_user.role != "parent":
         raise HTTPException(
             status_code=403,
-            detail="Not authorized to delete this photo"
+            detail="Not authorized to move this photo"
         )
 
-    try:
-        # 1. Remove file from storage
-        minio_client.remove_object(BUCKET_NAME, photo.minio_key)
+    if album_id is not None and not db.query(Album.id).filter(
+            Album.id == album_id).first():
+        raise HTTPException(status_code=404, detail="Album not found")
 
-        # 2. Remove from database
-        db.delete(photo)
-        db.commit()
-        return {"status": "success", "message": "Photo and file deleted"}
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Delete failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Cleanup failed")
+    # Leaving album_id empty takes the photo out of its album
+    move_photo(db, photo, album_id)
+    # The album title is part of the photo's search text
+    refresh_search(db, [photo.id])
+    db.commit()
+    response_cache.invalidate(PHOTOS, ALBUMS)
+    return {"status": "moved", "album_id": album_id}
 
 
 @family_photos_router.post("/{photo_id}/comment")
@@ -277,33 +801,61 @@ def add_comment(
         photo_id: int,
         text: str = Form(...),
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: UserPrincipal = Depends(get_current_user)
 ):
-    db.add(Comment(photo_id=photo_id,
-                   user_id=current_user.id,
-                   text=text))
+    comment = Comment(photo_id=photo_id,
+                      user_id=current_user.id,
+                      text=text)
+    db.add(comment)
+    db.flush()
+    bump_stats(db, {photo_id: {"comments": 1}})
+    refresh_search(db, [photo_id])
+    # Ids only, clients fetch the text from /{photo_id}/comments
+    publish(db, "comment", comment_id=comment.id, photo_id=photo_id,
+            user_id=current_user.id)
     db.commit()
+    response_cache.invalidate(PHOTOS)
     return {"status": "added"}
 
 
+@family_photos_router.get("/{photo_id}/comments")
+def get_comments(
+        photo_id: int,
+        limit: int = 50,
+        cursor: str = None,
+        db: Session = Depends(get_db)):
+    if not db.query(Photo.id).filter(Photo.id == photo_id).first():
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    try:
+        comments, next_cursor = comment_thread_page(db, photo_id,
+                                                    limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {
+        "comments": [{
+            "id": c.id,
+            "text": c.text,
+            "timestamp": c.timestamp,
+            "user": {
+                "id": c.user.id,
+                "username": c.user.username,
+                "display_name": c.user.display_name or c.user.username
+            }
+        } for c in comments],
+        "next_cursor": next_cursor
+    }
+
+
 @family_photos_router.post("/{photo_id}/view")
 def record_view(
         photo_id: int,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)):
-    # Use current_user.id instead of a passed parameter
-    existing_view = db.query(View).filter_by(
-        photo_id=photo_id,
-        user_id=current_user.id
-    ).first()
-
-    if not existing_view:
-        new_view = View(photo_id=photo_id, user_id=current_user.id)
-        db.add(new_view)
-        db.commit()
-        return {"status": "view_recorded"}
-
-    return {"status": "already_viewed"}
+        current_user: UserPrincipal = Depends(get_current_user)):
+    # Buffered and written in batches by the scheduler; duplicates are
+    # dropped by the (photo_id, user_id) unique constraint
+    record_views([photo_id], current_user.id)
+    return {"status": "view_recorded"}
 
 
 @family_photos_router.get("/{photo_id}/stats")
@@ -315,24 +867,23 @@ def get_photo_stats(photo_id: int, db: Session = Depends(get_db)):
     return {
         "viewed_by": [v.user.username for v in photo.views],
         "liked_by": [like.user.username for like in photo.likes],
-        "comment_count": len(photo.comments)
+        "comment_count": photo.stats.comments if photo.stats else 0
     }
 
 
 @family_photos_router.post("/profile/update")
-def update_profile(
+async def update_profile(
         display_name: str = Form(None),
         bio: str = Form(None),
         file: UploadFile = File(None),
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: UserPrincipal = Depends(get_current_user)
 ):
-    # Use the user object directly from the JWT payload
-    user = current_user
+    # The principal is a cached snapshot, edit the row itself
+    user = await run_in_threadpool(db.get, User, current_user.id)
 
     # 1. Store the old key for later cleanup
     old_photo_key = user.profile_photo_key
-    new_photo_key = None
 
     # 2. Handle metadata updates
     if display_name:
@@ -343,16 +894,18 @@ def update_profile(
     # 3. Process new photo if provided
     if file:
         file_ext = file.filename.split(".")[-1]
-        new_photo_key = f"profiles/{user.id}_{uuid.uuid4().hex[:6]}.{file_ext}"
 
         try:
-            upload_image_to_storage(
-                new_photo_key,
-                file.file,
-                -1,
-                file.content_type
-            )
+            new_photo_key, _ = await store_content(db,
+                                                   file.file,
+                                                   file_ext,
+                                                   file.content_type)
             user.profile_photo_key = new_photo_key
+            # Queued with the commit, so a failed cleanup is retried
+            if old_photo_key and await run_in_threadpool(
+                    release_content, db, old_photo_key):
+                await run_in_threadpool(enqueue_deletions, db,
+                                        [old_photo_key])
         except Exception as e:
             logger.error(
                 f"Failed to upload profile photo for user {user.id}: "
@@ -361,19 +914,14 @@ def update_profile(
                                 detail="Storage upload failed")
 
     try:
-        db.commit()
-        db.refresh(user)
+        await run_in_threadpool(_commit, db, user)
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         raise HTTPException(status_code=500,
                             detail=f"Database update failed - {e}")
-
-    # 4. Cleanup OLD photo
-    if file and old_photo_key:
-        try:
-            minio_client.remove_object(BUCKET_NAME, old_photo_key)
-        except Exception as e:
-            logger.error(f"Cleanup failure: {e}")
+    invalidate_user(user.id)
+    # Uploader names and avatars are embedded in photo responses too
+    response_cache.invalidate(USERS, PHOTOS)
 
     return {
         "id": user.id,
@@ -388,7 +936,12 @@ def update_profile(
 
 
 @family_photos_router.get("/users")
-def get_all_users(db: Session = Depends(get_db)):
+def get_all_users(request: Request, db: Session = Depends(get_db)):
+    key = response_cache.cache_key(USERS, request)
+    hit = response_cache.cached(key, request)
+    if hit:
+        return hit
+
     users = db.query(User).all()
     user_list = []
 
@@ -403,11 +956,11 @@ def get_all_users(db: Session = Depends(get_db)):
             "bio": user.bio
         })
 
-    return user_list
+    return response_cache.store(key, request, user_list)
 
 
 @family_photos_router.post("/users")
-def create_user(
+async def create_user(
         username: str = Form(...),
         display_name: str = Form(...),
         password: str = Form(...),
@@ -415,7 +968,8 @@ def create_user(
         db: Session = Depends(get_db)
 ):
     # 1. Check for existing user
-    existing_user = db.query(User).filter(User.username == username).first()
+    existing_user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == username).first())
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already taken")
 
@@ -424,25 +978,21 @@ def create_user(
     new_user = User(
         username=username,
         display_name=display_name,
-        hashed_password=hash_pw(password),
+        hashed_password=await hash_pw(password),
         role="parent"  # Default role
     )
 
     db.add(new_user)
-    db.flush()  # Flushes to get new_user.id for the filename
 
     # 3. Handle Profile Photo Upload
     if file:
         try:
-            # Create a unique key (path) for the storage bucket
+            # Stored under its content hash, shared if already uploaded
             ext = os.path.splitext(file.filename)[1]
-            # Saving in an 'avatars' folder within your bucket
-            unique_key = \
-                f"avatars/user_{new_user.id}_{uuid.uuid4().hex[:6]}{ext}"
-
-            # Read file content and upload
-            contents = file.file.read()
-            upload_image_to_storage(contents, unique_key)
+            unique_key, _ = await store_content(db,
+                                                file.file,
+                                                ext,
+                                                file.content_type)
 
             # Save the KEY to the database (not the full URL)
             new_user.profile_photo_key = unique_key
@@ -451,11 +1001,11 @@ def create_user(
             logger.error(f"Failed to upload avatar: {e}")
             # If upload fails, we don't want to create the user
             # without their photo
-            db.rollback()
+            await run_in_threadpool(db.rollback)
             raise HTTPException(status_code=500, detail="Photo upload failed")
 
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(_commit, db, new_user)
+    response_cache.invalidate(USERS)
 
     # 4. Return the new user data
     # We use get_image_url to convert the key back to a URL for the frontend
@@ -470,16 +1020,18 @@ def create_user(
 
 # Admin Reset Override
 @family_photos_router.post("/admin/reset-password")
-def admin_reset(target_id: int,
-                new_pass: str,
-                current_user: User = Depends(get_current_user),
-                db: Session = Depends(get_db)):
+async def admin_reset(
+        target_id: int,
+        new_pass: str,
+        current_user: UserPrincipal = Depends(get_current_user),
+        db: Session = Depends(get_db)):
     if current_user.role != "parent":
         raise HTTPException(status_code=403,
                             detail="Only parents can reset passwords")
-    target = db.query(User).filter(User.id == target_id).first()
-    target.hashed_password = hash_pw(new_pass)
-    db.commit()
+    target = await run_in_threadpool(db.get, User, target_id)
+    target.hashed_password = await hash_pw(new_pass)
+    await run_in_threadpool(db.commit)
+    invalidate_user(target.id)
     return {"status": "reset successful"}
 
 
@@ -505,7 +1057,7 @@ def refresh_token(
 def create_album(
         title: str = Form(...),
         description: str = Form(None),
-        current_user: User = Depends(get_current_user),
+        current_user: UserPrincipal = Depends(get_current_user),
         db: Session = Depends(get_db)):
     new_album = Album(
         title=title,
@@ -515,6 +1067,7 @@ def create_album(
     db.add(new_album)
     db.commit()
     db.refresh(new_album)
+    response_cache.invalidate(ALBUMS)
 
     return {
         "id": new_album.id,
@@ -522,38 +1075,71 @@ def create_album(
         "description": new_album.description,
         "photo_count": 0,
         "cover_url": None,
+        "cover_urls": None,
         "created_at": new_album.created_at
     }
 
 
 @family_photos_router.get("/albums")
-def list_albums(db: Session = Depends(get_db)):
-    albums = db.query(Album).all()
+def list_albums(request: Request, db: Session = Depends(get_db)):
+    key = response_cache.cache_key(ALBUMS, request)
+    hit = response_cache.cached(key, request)
+    if hit:
+        return hit
+
+    # Counts and covers are stored on the album, so this is one query
+    albums = db.query(Album).options(joinedload(Album.cover_photo)).all()
     result = []
     for a in albums:
-        # Fetch the first photo to use as a cover
-        cover_photo = db.query(Photo).filter(
-            Photo.album_id == a.id).first()
+        cover_photo = a.cover_photo
         result.append({
             "id": a.id,
             "title": a.title,
             "description": a.description,
-            "photo_count": len(a.photos),
+            "photo_count": a.photo_count,
             "cover_url": get_image_url(
                 cover_photo.minio_key) if cover_photo else None,
+            "cover_urls": photo_urls(
+                cover_photo.minio_key,
+                cover_photo.variants_ready) if cover_photo else None,
             "created_at": a.created_at
         })
-    return result
+    return response_cache.store(key, request, result)
 
 
 @family_photos_router.get("/albums/{album_id}/photos")
-def get_album_photos(album_id: int, db: Session = Depends(get_db)):
+def get_album_photos(album_id: int,
+                     request: Request,
+                     db: Session = Depends(get_db)):
+    key = response_cache.cache_key(PHOTOS, request)
+    hit = response_cache.cached(key, request)
+    if hit:
+        return hit
+
     album = db.query(Album).filter(Album.id == album_id).first()
     if not album:
         raise HTTPException(status_code=404, detail="Album not found")
 
-    photos = db.query(Photo).filter(
+    photos = _photo_query(db).filter(
         Photo.album_id == album_id).order_by(
         Photo.timestamp.desc()).all()
 
-    return format_photo_list(photos)
+    return response_cache.store(key, request, format_photo_list(photos, db))
+
+
+@family_photos_router.get("/albums/{album_id}/download")
+def download_album(album_id: int, db: Session = Depends(get_db)):
+    album = db.query(Album).filter(Album.id == album_id).first()
+    if not album:
+        raise HTTPException(status_code=404, detail="Album not found")
+
+    entries = album_entries(db, album_id)
+    file_name = re.sub(r"[^A-Za-z0-9._-]+", "-",
+                       album.title).strip("-") or f"album-{album_id}"
+
+    # The ZIP is built while it is sent, entries stored uncompressed
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition":
+                 f'attachment; filename="{file_name}.zip"'})
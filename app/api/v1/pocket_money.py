@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.database.database import get_db
+from app.core.ledger import apply_to_balance, set_balance, InsufficientFunds
 from app.models.user_models import Child, Transaction, Wish
 
 
@@ -26,22 +27,15 @@ def get_balance(child_name: str,
 def adjust_balance(child_id: int,
                    new_balance: float,
                    db: Session = Depends(get_db)):
-    child = db.query(Child).filter(Child.id == child_id).first()
-    if not child:
-        raise HTTPException(status_code=404, detail="Child not found")
-
     # Record why the manual adjustment happened
-    adjustment_entry = Transaction(
-        child_id=child.id,
-        amount=new_balance - child.balance,
-        description="Manual Balance Adjustment",
-        category="Correction"
-    )
-
-    child.balance = new_balance
-    db.add(adjustment_entry)
+    try:
+        balance = set_balance(db, child_id, new_balance,
+                              description="Manual Balance Adjustment",
+                              category="Correction")
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Child not found")
     db.commit()
-    return {"message": "Balance updated", "new_balance": child.balance}
+    return {"message": "Balance updated", "new_balance": balance}
 
 
 @pocket_money_router.post("/add-child/{name}")
@@ -152,28 +146,17 @@ def deposit_money(child_id: int,
                   amount: float,
                   description: str,
                   db: Session = Depends(get_db)):
-    # 1. Find the child
-    child = db.query(Child).filter(Child.id == child_id).first()
-    if not child:
+    # 1. Update the balance in SQL and record the Transaction
+    try:
+        _, balance, _ = apply_to_balance(db, child_id, amount,
+                                         description, "Deposit")
+    except LookupError:
         raise HTTPException(status_code=404, detail="Child not found")
 
-    # 2. Create the Transaction record (Now Transaction is USED!)
-    new_transaction = Transaction(
-        child_id=child.id,
-        amount=amount,
-        description=description,
-        category="Deposit"
-    )
-
-    # 3. Update the Child's balance
-    child.balance += amount
-
-    # 4. Save everything together (Atomic transaction)
-    db.add(new_transaction)
+    # 2. Save everything together (Atomic transaction)
     db.commit()
-    db.refresh(child)
 
-    return {"message": "Deposit successful", "new_balance": child.balance}
+    return {"message": "Deposit successful", "new_balance": balance}
 
 
 @pocket_money_router.get("/history/{child_id}")
@@ -199,35 +182,26 @@ def withdraw_money(child_id: int,
                    description: str,
                    category: str = "Spend",
                    db: Session = Depends(get_db)):
-    child = db.query(Child).filter(Child.id == child_id).first()
-
-    if not child:
+    # The funds check is part of the UPDATE, so two withdrawals at
+    # once cannot both pass it
+    try:
+        name, balance, new_transaction = apply_to_balance(
+            db, child_id, -abs(amount), description, category,
+            require_funds=True)
+    except LookupError:
         raise HTTPException(status_code=404, detail="Child not found")
-    # Check if sufficient money available
-    if child.balance < amount:
+    except InsufficientFunds as e:
         raise HTTPException(
             status_code=404,
-            detail=f"Insufficient funds. {child.name} only has"
-                   f" {child.balance} available.")
-    # Create negative transaction record
-    new_transaction = Transaction(
-        child_id=child.id,
-        amount=-abs(amount),
-        description=description,
-        category=category
-    )
-
-    # Update balance of child
-    child.balance -= abs(amount)
-    db.add(new_transaction)
+            detail=f"Insufficient funds. {e.name} only has"
+                   f" {e.balance} available.")
     db.commit()
-    db.refresh(child)
 
     return {
         "status": "success",
-        "child_name": child.name,
+        "child_name": name,
         "withdrawn": amount,
-        "new_balance": child.balance,
+        "new_balance": balance,
         "transaction_id": new_transaction.id
     }
 
@@ -0,0 +1,158 @@
+import io
+import logging
+import os
+import queue
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.storage import get_backend
+from app.core.storage_backends import ObjectNotFound
+from app.models.photo_model import Photo
+
+
+logger = logging.getLogger(__name__)
+
+# Objects fetched ahead of the one being written to the archive
+ZIP_PREFETCH_OBJECTS = int(os.getenv("ZIP_PREFETCH_OBJECTS", "2"))
+# Chunks (STREAM_CHUNK_SIZE each) buffered per object being fetched,
+# so memory is bounded by (prefetch + 1) * read-ahead chunks
+ZIP_READ_AHEAD_CHUNKS = int(os.getenv("ZIP_READ_AHEAD_CHUNKS", "4"))
+
+_END = object()
+_ZIP_EPOCH = datetime(1980, 1, 1)
+
+
+class ZipEntry(NamedTuple):
+    name: str
+    key: str
+    modified: Optional[datetime] = None
+
+
+class _Sink(io.RawIOBase):
+    """
+    Write-only, unseekable buffer for ZipFile. Without seek() ZipFile
+    writes sizes and CRCs in data descriptors after each entry, so the
+    archive can be sent as it is produced.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def album_entries(db: Session, album_id: int) -> List[ZipEntry]:
+    """
+    One entry per photo of an album, oldest first, named after the
+    capture time and photo id. Rows without a capture time fall back
+    to the upload time, or to the id alone.
+    Only keys and dates are loaded, the bytes are streamed later.
+    """
+    taken = func.coalesce(Photo.taken_at, Photo.timestamp)
+    entries = []
+    for photo_id, key, when in db.query(
+            Photo.id, Photo.minio_key, taken).filter(
+            Photo.album_id == album_id).order_by(taken, Photo.id):
+        prefix = f"{when:%Y-%m-%d_%H%M%S}_" if when else ""
+        entries.append(ZipEntry(
+            f"{prefix}{photo_id}.{key.rsplit('.', 1)[-1]}", key, when))
+    return entries
+
+
+def _fetch(key: str, chunks: queue.Queue, cancelled: threading.Event):
+    """Streams one object into a bounded queue, ending with _END."""
+    def put(item):
+        # Re-checks for an abandoned download while the queue is full
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for chunk in get_backend().stream(key):
+            if not put(chunk):
+                return
+        put(_END)
+    except Exception as e:
+        put(e)
+
+
+def stream_zip(entries: Iterable[ZipEntry],
+               prefetch: int = ZIP_PREFETCH_OBJECTS,
+               read_ahead: int = ZIP_READ_AHEAD_CHUNKS) -> Iterator[bytes]:
+    """
+    Generates a ZIP of storage objects as it is downloaded. Entries are
+    stored as-is (photos are already compressed) and the next
+    `prefetch` objects are fetched concurrently while the current one
+    is written. Missing objects are left out.
+    """
+    entries = iter(entries)
+    pending = deque()
+    cancelled = threading.Event()
+    sink = _Sink()
+
+    with ThreadPoolExecutor(max_workers=prefetch + 1,
+                            thread_name_prefix="zip-fetch") as pool:
+        def start_next():
+            entry = next(entries, None)
+            if entry is not None:
+                chunks = queue.Queue(maxsize=read_ahead)
+                pool.submit(_fetch, entry.key, chunks, cancelled)
+                pending.append((entry, chunks))
+
+        try:
+            for _ in range(prefetch + 1):
+                start_next()
+
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED,
+                                 allowZip64=True) as archive:
+                while pending:
+                    entry, chunks = pending.popleft()
+                    start_next()
+
+                    first = chunks.get()
+                    if isinstance(first, ObjectNotFound):
+                        logger.warning(f"Skipping missing object "
+                                       f"{entry.key} in ZIP export")
+                        continue
+
+                    modified = max(entry.modified or _ZIP_EPOCH, _ZIP_EPOCH)
+                    info = zipfile.ZipInfo(entry.name,
+                                           modified.timetuple()[:6])
+                    with archive.open(info, "w", force_zip64=True) as out:
+                        chunk = first
+                        while chunk is not _END:
+                            if isinstance(chunk, Exception):
+                                raise chunk
+                            out.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                            chunk = chunks.get()
+                    yield sink.drain()
+            # Central directory, written when the archive is closed
+            yield sink.drain()
+        finally:
+            # Stops fetchers blocked on a full queue (e.g. the client
+            # went away) so the pool can shut down
+            cancelled.set()
@@ -0,0 +1,53 @@
+from typing import List, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.photo_model import Album, Photo
+
+
+def add_to_album(db: Session, album_id: Optional[int], photo_id: int):
+    """Counts a new photo in its album; the first one becomes the cover."""
+    if album_id is None:
+        return
+    db.execute(
+        update(Album).where(Album.id == album_id).values(
+            photo_count=Album.photo_count + 1,
+            cover_photo_id=func.coalesce(Album.cover_photo_id, photo_id)
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def remove_from_album(db: Session,
+                      album_id: Optional[int],
+                      photo_ids: List[int]):
+    """
+    Uncounts photos leaving an album. If the cover is one of them, the
+    oldest remaining photo takes over (or the cover is cleared).
+    Must run before the photo rows are deleted or moved.
+    """
+    if album_id is None or not photo_ids:
+        return
+    replacement = select(Photo.id).where(
+        Photo.album_id == album_id,
+        Photo.id.notin_(photo_ids)
+    ).order_by(Photo.id).limit(1).scalar_subquery()
+
+    db.execute(
+        update(Album).where(Album.id == album_id).values(
+            photo_count=Album.photo_count - len(photo_ids),
+            cover_photo_id=case(
+                (Album.cover_photo_id.in_(photo_ids), replacement),
+                else_=Album.cover_photo_id)
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def move_photo(db: Session, photo: Photo, album_id: Optional[int]):
+    """Reassigns a photo, keeping both albums' counters in step."""
+    if photo.album_id == album_id:
+        return
+    remove_from_album(db, photo.album_id, [photo.id])
+    photo.album_id = album_id
+    db.flush()
+    add_to_album(db, album_id, photo.id)
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+from contextlib import nullcontext
+from typing import BinaryIO, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.derivatives import derivative_keys
+from app.core.storage import async_storage
+from app.models.photo_model import StoredObject, PendingDeletion
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_stream(stream: BinaryIO,
+                chunk_size: int = HASH_CHUNK_SIZE) -> Tuple[str, int]:
+    """
+    SHA-256 of a file-like object, read in chunks so large uploads are
+    never held in memory. The stream is rewound afterwards.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+
+def content_key(sha256: str, file_ext: str) -> str:
+    ext = file_ext.lstrip(".").lower()
+    return f"objects/{sha256}.{ext}" if ext else f"objects/{sha256}"
+
+
+def _add_reference(db: Session, sha256: str):
+    """Bumps the ref count of an already stored hash, returns its key."""
+    existing = db.query(StoredObject).filter(
+        StoredObject.sha256 == sha256).with_for_update().first()
+    if existing is None:
+        return None
+    existing.ref_count += 1
+    db.flush()
+    return existing.key
+
+
+def _cancel_deletion(db: Session, key: str):
+    """
+    Takes a re-uploaded object (and its derivatives) back off the
+    deletion queue before it is written again. The row lock keeps the
+    deletion worker away until this transaction ends.
+    """
+    db.query(PendingDeletion).filter(
+        PendingDeletion.key.in_([key] + derivative_keys(key))
+    ).delete(synchronize_session=False)
+
+
+def _record_object(db: Session, key: str, sha256: str,
+                   size: int) -> Tuple[str, bool]:
+    try:
+        # Savepoint: a concurrent upload of the same bytes may have
+        # inserted the row first, in which case we just reference it.
+        with db.begin_nested():
+            db.add(StoredObject(key=key, sha256=sha256,
+                                size=size, ref_count=1))
+    except IntegrityError:
+        return _add_reference(db, sha256), False
+    return key, True
+
+
+async def store_content(db: Session,
+                        stream: BinaryIO,
+                        file_ext: str,
+                        content_type: str = "image/jpeg",
+                        db_lock: Optional[asyncio.Lock] = None
+                        ) -> Tuple[str, bool]:
+    """
+    Stores an upload under its content hash, or reuses the existing
+    object when the same bytes were uploaded before.
+
+    The reference is taken inside the caller's transaction, so it is
+    released again if the caller rolls back.
+    Pass `db_lock` when several uploads share one session concurrently:
+    session work is serialised while hashing and writes overlap.
+    Returns (key, is_new).
+    """
+    sha256, size = await run_in_threadpool(hash_stream, stream)
+
+    async with db_lock or nullcontext():
+        existing_key = await run_in_threadpool(_add_reference, db, sha256)
+    if existing_key:
+        return existing_key, False
+
+    key = content_key(sha256, file_ext)
+    async with db_lock or nullcontext():
+        await run_in_threadpool(_cancel_deletion, db, key)
+    await async_storage.put_object(key, stream, size, content_type)
+    async with db_lock or nullcontext():
+        return await run_in_threadpool(_record_object,
+                                       db, key, sha256, size)
+
+
+def release_content(db: Session, key: str) -> bool:
+    """
+    Drops one reference to `key` in the caller's transaction.
+    Returns True when it was the last one and the object should be
+    removed from storage once the transaction has committed.
+    Keys from before content addressing have no row and are always
+    single-reference.
+    """
+    obj = db.query(StoredObject).filter(
+        StoredObject.key == key).with_for_update().first()
+    if obj is None:
+        return True
+
+    obj.ref_count -= 1
+    if obj.ref_count <= 0:
+        db.delete(obj)
+        return True
+    return False
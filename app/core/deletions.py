@@ -0,0 +1,138 @@
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.core.albums import remove_from_album
+from app.core.content_store import release_content
+from app.core.derivatives import derivative_keys
+from app.core.image_cache import image_cache
+from app.core.photo_stats import dialect_insert
+from app.core.search import remove_from_search
+from app.core.storage import get_backend
+from app.database.database import SessionLocal
+from app.models.photo_model import (Photo, Like, Comment, View,
+                                    PhotoStats, PendingDeletion)
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled drains of the deletion queue
+DELETE_DRAIN_SECONDS = int(os.getenv("DELETE_DRAIN_SECONDS", "30"))
+# Keys per batched remove call (MinIO accepts up to 1000)
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+DELETE_RETRY_BASE_SECONDS = 30
+DELETE_RETRY_MAX_SECONDS = 3600
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue_deletions(db: Session, keys: Iterable[str]):
+    """Queues storage keys for removal in the caller's transaction."""
+    rows = [{"key": key, "attempts": 0, "next_attempt_at": _utcnow()}
+            for key in dict.fromkeys(keys)]
+    if not rows:
+        return
+    stmt = dialect_insert(db, PendingDeletion).values(rows)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["key"]))
+
+
+def delete_photos(db: Session, photos: List[Photo]) -> List[str]:
+    """
+    Deletes photos with their likes, comments, views and counters using
+    one statement per table, and queues every stored object (with its
+    derivatives) that lost its last reference. Runs in the caller's
+    transaction; returns the queued keys.
+    """
+    if not photos:
+        return []
+    ids = [p.id for p in photos]
+
+    # 1. Album counters and covers, before the rows disappear
+    by_album = defaultdict(list)
+    for photo in photos:
+        by_album[photo.album_id].append(photo.id)
+    for album_id, photo_ids in by_album.items():
+        remove_from_album(db, album_id, photo_ids)
+
+    # 2. Storage references; shared objects stay until the last one
+    keys = []
+    for photo in photos:
+        if release_content(db, photo.minio_key):
+            keys += [photo.minio_key] + derivative_keys(photo.minio_key)
+
+    # 3. Rows, dependents first
+    remove_from_search(db, ids)
+    for model in (Like, Comment, View, PhotoStats):
+        db.execute(delete(model).where(model.photo_id.in_(ids))
+                   .execution_options(synchronize_session=False))
+    db.execute(delete(Photo).where(Photo.id.in_(ids))
+               .execution_options(synchronize_session=False))
+    for photo in photos:
+        db.expunge(photo)
+
+    enqueue_deletions(db, keys)
+    return keys
+
+
+def _retry_at(attempts: int) -> datetime:
+    delay = min(DELETE_RETRY_BASE_SECONDS * 2 ** attempts,
+                DELETE_RETRY_MAX_SECONDS)
+    return _utcnow() + timedelta(seconds=delay)
+
+
+def drain_deletions(db: Optional[Session] = None,
+                    batch_size: int = DELETE_BATCH_SIZE) -> int:
+    """
+    Removes due keys from storage with batched deletes, scheduled every
+    DELETE_DRAIN_SECONDS and kicked after each delete request. Failed
+    keys stay queued with exponential backoff.
+    Returns the number of keys removed.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    removed = 0
+    try:
+        while True:
+            # SKIP LOCKED lets several workers drain without overlap
+            rows = db.query(PendingDeletion).filter(
+                PendingDeletion.next_attempt_at <= _utcnow()
+            ).order_by(PendingDeletion.next_attempt_at).limit(
+                batch_size).with_for_update(skip_locked=True).all()
+            if not rows:
+                break
+
+            keys = [row.key for row in rows]
+            try:
+                failed = set(get_backend().delete_many(keys))
+            except Exception as e:
+                logger.error(f"Batched delete of {len(keys)} keys "
+                             f"failed: {e}")
+                failed = set(keys)
+
+            for row in rows:
+                if row.key in failed:
+                    row.attempts += 1
+                    row.next_attempt_at = _retry_at(row.attempts)
+                else:
+                    db.delete(row)
+            db.commit()
+
+            done = [key for key in keys if key not in failed]
+            image_cache.discard(*done)
+            removed += len(done)
+            if len(rows) < batch_size:
+                break
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Deletion drain failed: {e}")
+    finally:
+        if own_session:
+            db.close()
+    return removed
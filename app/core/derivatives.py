@@ -0,0 +1,151 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core import response_cache
+from app.core.phash import dhash, to_signed
+from app.core.storage import (get_backend, upload_image_to_storage,
+                              get_image_url)
+from app.database.database import SessionLocal
+from app.models.photo_model import Photo
+
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each derivative size
+DERIVATIVE_SIZES = {
+    "thumb": 320,
+    "feed": 1080,
+    "full": 2048,
+}
+_CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+DERIVATIVE_FORMAT = os.getenv("DERIVATIVE_FORMAT", "webp").lower()
+if DERIVATIVE_FORMAT not in _CONTENT_TYPES:
+    # Otherwise every upload would fail its derivatives
+    logger.warning(f"Unsupported DERIVATIVE_FORMAT {DERIVATIVE_FORMAT!r}, "
+                   f"using webp (supported: {', '.join(_CONTENT_TYPES)})")
+    DERIVATIVE_FORMAT = "webp"
+DERIVATIVE_QUALITY = int(os.getenv("DERIVATIVE_QUALITY", "80"))
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Jobs start on several threadpool threads at once
+_pool_lock = threading.Lock()
+
+
+def derivative_key(minio_key: str, size: str) -> str:
+    """
+    Storage key of a derivative, stored next to the original.
+    e.g. 'abc.jpg' -> 'abc_thumb.webp'
+    """
+    stem = minio_key.rsplit(".", 1)[0]
+    ext = "jpg" if DERIVATIVE_FORMAT == "jpeg" else DERIVATIVE_FORMAT
+    return f"{stem}_{size}.{ext}"
+
+
+def derivative_keys(minio_key: str):
+    return [derivative_key(minio_key, size) for size in DERIVATIVE_SIZES]
+
+
+def photo_urls(minio_key: str, variants_ready: bool) -> Dict[str, str]:
+    """
+    Per-size URLs for a photo. Until the pipeline has finished every
+    size points at the original so clients never get a broken link.
+    """
+    if not variants_ready:
+        original = get_image_url(minio_key)
+        return {size: original for size in DERIVATIVE_SIZES}
+    return {size: get_image_url(derivative_key(minio_key, size))
+            for size in DERIVATIVE_SIZES}
+
+
+def render_derivatives(original: bytes,
+                       image_format: str = DERIVATIVE_FORMAT,
+                       quality: int = DERIVATIVE_QUALITY
+                       ) -> Dict[str, bytes]:
+    """
+    Resizes an image into every derivative size.
+    Pure CPU work, so it is run on the process pool.
+    """
+    with Image.open(io.BytesIO(original)) as img:
+        # Bake the EXIF rotation in, derivatives carry no metadata
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        if image_format == "jpeg" and img.mode == "RGBA":
+            img = img.convert("RGB")
+
+        results = {}
+        for size, edge in DERIVATIVE_SIZES.items():
+            variant = img.copy()
+            # thumbnail() keeps the aspect ratio and never upscales
+            variant.thumbnail((edge, edge), Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, format=image_format.upper(),
+                         quality=quality)
+            results[size] = buffer.getvalue()
+        return results
+
+
+def process_original(original: bytes) -> Tuple[Dict[str, bytes], int]:
+    """Derivatives and perceptual hash, in one trip to the pool."""
+    return render_derivatives(original), dhash(original)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=DERIVATIVE_WORKERS)
+        return _pool
+
+
+def shutdown_derivative_pool():
+    """Called from the app lifespan on shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def generate_derivatives(photo_id: int, minio_key: str):
+    """
+    Background task run after an upload: fetches the original, renders
+    the sizes and the perceptual hash on the process pool, stores them
+    and flags the photo.
+    """
+    try:
+        original = get_backend().get(minio_key)
+
+        rendered, phash = _get_pool().submit(process_original,
+                                             original).result()
+
+        for size, data in rendered.items():
+            upload_image_to_storage(
+                derivative_key(minio_key, size),
+                io.BytesIO(data),
+                len(data),
+                _CONTENT_TYPES[DERIVATIVE_FORMAT]
+            )
+    except Exception as e:
+        logger.error(f"Derivatives failed for photo {photo_id}: {e}")
+        return
+
+    db = SessionLocal()
+    try:
+        db.query(Photo).filter(Photo.id == photo_id).update(
+            {Photo.variants_ready: True, Photo.phash: to_signed(phash)})
+        db.commit()
+        # URLs in cached feeds and album covers switch to the derivatives
+        response_cache.invalidate(response_cache.PHOTOS,
+                                  response_cache.ALBUMS,
+                                  response_cache.DUPLICATES)
+    finally:
+        db.close()
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import response_cache
+from app.core.phash import dhash, from_signed, near_pairs, to_signed
+from app.core.storage import get_backend
+from app.database.database import SessionLocal
+from app.models.photo_model import Photo
+
+
+logger = logging.getLogger(__name__)
+
+# Hashes at most this many bits apart are near-duplicates
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "8"))
+# Hashes with fewer bits set (or unset) than this are never grouped
+PHASH_MIN_BITS = 4
+# Upper bound on how stale cached groups get if an invalidation is lost
+PHASH_GROUPS_TTL = int(os.getenv("PHASH_GROUPS_TTL", "3600"))
+# Objects downloaded and hashed at once by the backfill
+PHASH_BACKFILL_WORKERS = int(os.getenv("PHASH_BACKFILL_WORKERS", "4"))
+PHASH_BACKFILL_BATCH = int(os.getenv("PHASH_BACKFILL_BATCH", "100"))
+
+
+def _informative(value: int) -> bool:
+    # Flat or evenly graded images hash to (nearly) all zeros or ones
+    return PHASH_MIN_BITS <= value.bit_count() <= 64 - PHASH_MIN_BITS
+
+
+def find_duplicate_groups(db: Session,
+                          max_distance: int = PHASH_MAX_DISTANCE
+                          ) -> List[List[int]]:
+    """
+    Photo ids grouped by near-identical perceptual hash, largest group
+    first, newest photo first within a group. Photos are grouped by
+    exact hash first, then the distinct hashes are linked through
+    near_pairs(), so a burst of similar shots forms a single group.
+    Hashes with almost no bits set (or unset) say nothing about the
+    picture and are left out.
+    """
+    by_hash = defaultdict(list)
+    for photo_id, value in db.query(Photo.id, Photo.phash).filter(
+            Photo.phash.isnot(None)).yield_per(5000):
+        value = from_signed(value)
+        if _informative(value):
+            by_hash[value].append(photo_id)
+
+    # 1. Union-find over the distinct hashes
+    values = list(by_hash)
+    parent = list(range(len(values)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for i, j in near_pairs(values, max_distance):
+        parent[find(j)] = find(i)
+
+    # 2. Photos per group; single photos are not duplicates
+    groups = defaultdict(list)
+    for index, value in enumerate(values):
+        groups[find(index)].extend(by_hash[value])
+    result = [sorted(ids, reverse=True) for ids in groups.values()
+              if len(ids) > 1]
+    result.sort(key=lambda ids: (-len(ids), -ids[0]))
+    return result
+
+
+def duplicate_groups(db: Session,
+                     max_distance: int = PHASH_MAX_DISTANCE
+                     ) -> List[List[int]]:
+    """
+    find_duplicate_groups() kept in the response cache under the
+    DUPLICATES scope, which only uploads, deletes and new hashes
+    invalidate, so likes and comments do not trigger a recount.
+    """
+    cache = response_cache.backend
+    try:
+        key = (f"{response_cache.DUPLICATES}:"
+               f"{cache.generation(response_cache.DUPLICATES)}:"
+               f"{max_distance}")
+        value = cache.get(key)
+    except Exception as e:
+        logger.error(f"Duplicate groups cache read failed: {e}")
+        key = value = None
+    if value is not None:
+        return json.loads(value)
+
+    groups = find_duplicate_groups(db, max_distance)
+    if key is not None:
+        try:
+            cache.set(key, json.dumps(groups).encode(), PHASH_GROUPS_TTL)
+        except Exception as e:
+            logger.error(f"Duplicate groups cache write failed: {e}")
+    return groups
+
+
+def _fetch_and_hash(pool: ProcessPoolExecutor, key: str) -> Optional[int]:
+    try:
+        data = get_backend().get(key)
+        return pool.submit(dhash, data).result()
+    except Exception as e:
+        logger.error(f"Perceptual hash failed for {key}: {e}")
+        return None
+
+
+def backfill_phash(db: Optional[Session] = None,
+                   workers: int = PHASH_BACKFILL_WORKERS,
+                   batch_size: int = PHASH_BACKFILL_BATCH) -> int:
+    """
+    Hashes every stored original that has no perceptual hash yet.
+    Downloads run on a thread pool and hashing on a process pool, each
+    `workers` wide, so at most that many originals are held in memory.
+    Objects shared by several photos are hashed once. Unreadable ones
+    are skipped and retried on the next run.
+    Returns the number of objects hashed.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    hashed = 0
+    last_key = ""
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as fetchers, \
+                ProcessPoolExecutor(max_workers=workers) as hashers:
+            while True:
+                keys = [key for (key,) in db.query(Photo.minio_key).filter(
+                    Photo.phash.is_(None),
+                    Photo.minio_key > last_key
+                ).distinct().order_by(Photo.minio_key).limit(batch_size)]
+                if not keys:
+                    break
+                last_key = keys[-1]
+
+                values = fetchers.map(
+                    lambda key: _fetch_and_hash(hashers, key), keys)
+                for key, value in zip(keys, values):
+                    if value is None:
+                        continue
+                    db.query(Photo).filter(Photo.minio_key == key).update(
+                        {Photo.phash: to_signed(value)},
+                        synchronize_session=False)
+                    hashed += 1
+                db.commit()
+                logger.info(f"Perceptual hashes: {hashed} objects done")
+    finally:
+        if own_session:
+            db.close()
+
+    if hashed:
+        response_cache.invalidate(response_cache.PHOTOS,
+                                  response_cache.DUPLICATES)
+    return hashed
+
+
+if __name__ == "__main__":
+    # python -m app.core.duplicates
+    logging.basicConfig(level=logging.INFO)
+    print(f"Hashed {backfill_phash()} objects")
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+from typing import Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel shared by every worker of the deployment
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "family_photo_events")
+# "false" keeps events inside one process even on Postgres
+EVENTS_BRIDGE = os.getenv("EVENTS_BRIDGE", "true").lower() == "true"
+# Events buffered per client before it is told to resync
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_KEEPALIVE_SECONDS = 15
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+EVENTS_MAX_PAYLOAD_BYTES = 7999
+
+# Sent instead of the events a slow client missed
+RESYNC = json.dumps({"type": "resync"})
+
+_PENDING = "pending_events"
+
+Subscription = Tuple[asyncio.AbstractEventLoop, asyncio.Queue]
+
+
+def _offer(queue: asyncio.Queue, payload: str):
+    if queue.full():
+        # Missed events cannot be patched in, the client refetches
+        while not queue.empty():
+            queue.get_nowait()
+        payload = RESYNC
+    queue.put_nowait(payload)
+
+
+class EventBus:
+    """
+    In-process fan-out of event payloads to the open SSE connections.
+    Each subscriber owns a bounded queue on its event loop; dispatch
+    may be called from any thread.
+    """
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._dispatched = 0
+
+    def subscribe(self) -> Subscription:
+        """Call from the event loop that will read the queue."""
+        subscription = (asyncio.get_running_loop(),
+                        asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def dispatch(self, payload: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._dispatched += 1
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, payload)
+            except RuntimeError:
+                # The loop has closed under a connection that never
+                # got to unsubscribe
+                self.unsubscribe((loop, queue))
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers),
+                    "dispatched": self._dispatched,
+                    "bridge": _bridge is not None}
+
+
+event_bus = EventBus()
+
+
+def publish(db: Session, event_type: str, **data):
+    """
+    Queues an event in the caller's transaction. It reaches clients
+    only once the transaction commits, and never if it rolls back.
+    With the Postgres bridge running it goes out through NOTIFY (which
+    Postgres also holds until commit) to every worker, this one
+    included.
+    Events carry ids only; one too large for NOTIFY (e.g. a huge bulk
+    delete) is replaced by a resync rather than failing the caller.
+    """
+    payload = json.dumps({"type": event_type, **data},
+                         separators=(",", ":"), default=str)
+    if len(payload.encode()) > EVENTS_MAX_PAYLOAD_BYTES:
+        logger.warning(f"Event {event_type} is too large to publish, "
+                       f"sending resync instead")
+        payload = RESYNC
+    if _bridge is not None:
+        db.execute(sql_select(func.pg_notify(EVENTS_CHANNEL, payload)))
+    else:
+        # Begins the transaction, so a rollback always drops the event
+        db.connection()
+        db.info.setdefault(_PENDING, []).append(payload)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending(session: Session):
+    for payload in session.info.pop(_PENDING, []):
+        event_bus.dispatch(payload)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING, None)
+
+
+class _NotifyBridge(threading.Thread):
+    """
+    Listens on EVENTS_CHANNEL with a dedicated connection and hands
+    every notification to the local bus. Reconnects after errors.
+    """
+
+    def __init__(self, engine: Engine):
+        super().__init__(name="event-bridge", daemon=True)
+        self.engine = engine
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"Event bridge connection lost: {e}")
+                self.stopping.wait(5)
+
+    def _listen(self):
+        conn = self.engine.raw_connection()
+        try:
+            dbapi_conn = conn.driver_connection
+            dbapi_conn.autocommit = True
+            with dbapi_conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{EVENTS_CHANNEL}"')
+            while not self.stopping.is_set():
+                # Wakes up at least once a second to check for shutdown
+                if not select.select([dbapi_conn], [], [], 1.0)[0]:
+                    continue
+                dbapi_conn.poll()
+                while dbapi_conn.notifies:
+                    event_bus.dispatch(dbapi_conn.notifies.pop(0).payload)
+        finally:
+            conn.invalidate()
+
+
+_bridge: Optional[_NotifyBridge] = None
+
+
+def start_event_bridge(engine: Engine):
+    """
+    Called from the app lifespan. Only Postgres deployments get the
+    bridge; elsewhere events stay within the process.
+    """
+    global _bridge
+    if not EVENTS_BRIDGE or engine.dialect.name != "postgresql" or \
+            _bridge is not None:
+        return
+    _bridge = _NotifyBridge(engine)
+    _bridge.start()
+
+
+def stop_event_bridge():
+    global _bridge
+    if _bridge is not None:
+        _bridge.stopping.set()
+        _bridge.join(timeout=5)
+        _bridge = None
+
+
+def format_event(payload: str) -> str:
+    """One server-sent event; the type is inside the JSON."""
+    return f"data: {payload}\n\n"
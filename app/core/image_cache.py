@@ -0,0 +1,221 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional, Tuple
+
+from starlette.responses import FileResponse
+
+from app.core.storage import get_backend
+
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "/tmp/family-photos-cache")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES",
+                                      str(1024 ** 3)))
+# Keys never change content (uuid, content hash or derived from one)
+IMAGE_CACHE_CONTROL = os.getenv("IMAGE_CACHE_CONTROL",
+                                "public, max-age=31536000, immutable")
+
+
+def _file_name(key: str) -> str:
+    # Hashed so keys with slashes or dots can never escape the directory
+    ext = os.path.splitext(key)[1][:8]
+    return hashlib.sha256(key.encode()).hexdigest() + ext
+
+
+def _etag(key: str, size: int, mtime: float) -> str:
+    raw = f"{key}-{size}-{int(mtime)}".encode()
+    return f'"{hashlib.sha1(raw).hexdigest()}"'
+
+
+class DiskLRUCache:
+    """
+    Size-bounded cache of storage objects on local disk, evicting the
+    least recently served object first. Files are written under a
+    temporary name and renamed into place, so readers never see a
+    partial object. Paths handed out with `pin` are not evicted until
+    released, so a response never loses its file mid-flight. The index
+    is rebuilt from the directory on start.
+    """
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR,
+                 max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # file name -> size
+        self._total = 0
+        self._pins = Counter()  # file name -> responses using it
+        self._lock = threading.Lock()
+        self._fetch_locks = {}  # key -> [lock, callers holding it]
+        self._loaded = False
+
+    def _load(self):
+        """Adopts files left by a previous run, oldest access first."""
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".part"):
+                os.remove(entry.path)
+            elif entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_atime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+        self._loaded = True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, key: str, pin: bool = False) -> Optional[str]:
+        """
+        Path of the cached copy of `key`, or None. With `pin` the file
+        stays until release() is called with the path.
+        """
+        name = _file_name(key)
+        with self._lock:
+            self._load()
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+            if pin:
+                self._pins[name] += 1
+        return self._path(name)
+
+    def release(self, path: str):
+        """Unpins a path returned with `pin` once it has been served."""
+        name = os.path.basename(path)
+        with self._lock:
+            self._pins[name] -= 1
+            if self._pins[name] <= 0:
+                del self._pins[name]
+            # Catches up on evictions the pin held back
+            self._evict()
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        Drops least recently used files until within max_bytes, except
+        pinned ones and `keep` (a file about to be handed out).
+        """
+        for name in list(self._entries):
+            if self._total <= self.max_bytes:
+                break
+            if name in self._pins or name == keep:
+                continue
+            size = self._entries.pop(name)
+            self._total -= size
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+    def fetch(self, key: str, pin: bool = False) -> Optional[str]:
+        """
+        Downloads `key` into the cache (blocking, run it on the storage
+        pool) and returns its path, pinned as with get(). Concurrent
+        misses for the same key share one download. Returns None when
+        the object is larger than the whole cache.
+        """
+        with self._lock:
+            waiters = self._fetch_locks.setdefault(
+                key, [threading.Lock(), 0])
+            waiters[1] += 1
+
+        try:
+            with waiters[0]:
+                path = self.get(key, pin)
+                if path:
+                    return path
+                return self._download(key, pin)
+        finally:
+            with self._lock:
+                # The lock goes only with its last waiter, so a later
+                # miss can never start a second download next to it
+                waiters[1] -= 1
+                if not waiters[1]:
+                    del self._fetch_locks[key]
+
+    def _download(self, key: str, pin: bool) -> Optional[str]:
+        backend = get_backend()
+        stat = backend.stat(key)
+        if stat.size > self.max_bytes:
+            return None
+
+        name = _file_name(key)
+        fd, part = tempfile.mkstemp(prefix=name + ".", suffix=".part",
+                                    dir=self.directory)
+        os.close(fd)
+        try:
+            backend.download(key, part)
+            if stat.last_modified:
+                # Stable ETags across evictions and restarts
+                mtime = stat.last_modified.timestamp()
+                os.utime(part, (mtime, mtime))
+            os.replace(part, self._path(name))
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+
+        with self._lock:
+            # Replaces, rather than adds to, an entry already indexed
+            self._total += stat.size - self._entries.get(name, 0)
+            self._entries[name] = stat.size
+            self._entries.move_to_end(name)
+            if pin:
+                self._pins[name] += 1
+            self._evict(keep=name)
+        return self._path(name)
+
+    def discard(self, *keys: str):
+        """Called once objects have been removed from storage."""
+        with self._lock:
+            self._load()
+            for key in keys:
+                name = _file_name(key)
+                size = self._entries.pop(name, None)
+                if size is None:
+                    continue
+                self._total -= size
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {"objects": len(self._entries),
+                    "bytes": self._total,
+                    "max_bytes": self.max_bytes}
+
+
+image_cache = DiskLRUCache()
+
+
+class PinnedFileResponse(FileResponse):
+    """
+    Serves a path pinned in `cache` and releases it once the response
+    is done, including when the client goes away mid-transfer.
+    """
+
+    def __init__(self, cache: DiskLRUCache, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self._cache = cache
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._cache.release(self.path)
+
+
+def file_headers(key: str, path: str) -> Tuple[str, dict]:
+    """Media type and caching headers for a cached object."""
+    stat = os.stat(path)
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    return media_type, {"ETag": _etag(key, stat.st_size, stat.st_mtime),
+                        "Cache-Control": IMAGE_CACHE_CONTROL}
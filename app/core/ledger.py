@@ -0,0 +1,93 @@
+from typing import Dict, Tuple
+
+from sqlalchemy import case, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.user_models import Child, Transaction
+
+
+class InsufficientFunds(Exception):
+    def __init__(self, name: str, balance: float):
+        super().__init__(f"{name} only has {balance} available")
+        self.name = name
+        self.balance = balance
+
+
+def apply_to_balance(db: Session,
+                     child_id: int,
+                     amount: float,
+                     description: str,
+                     category: str,
+                     require_funds: bool = False
+                     ) -> Tuple[str, float, Transaction]:
+    """
+    Adds `amount` (negative to take money out) to a balance with one
+    UPDATE ... RETURNING and records the Transaction in the caller's
+    transaction. With `require_funds` the check is part of the UPDATE,
+    so concurrent withdrawals can never overdraw the account.
+    Returns (child name, new balance, transaction).
+    Raises LookupError for an unknown child and InsufficientFunds.
+    """
+    stmt = update(Child).where(Child.id == child_id)
+    if require_funds:
+        stmt = stmt.where(Child.balance >= -amount)
+    row = db.execute(
+        stmt.values(balance=Child.balance + amount)
+        .returning(Child.name, Child.balance)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if row is None:
+        # Either way nothing was written; only now is a read needed
+        child = db.query(Child.name, Child.balance).filter(
+            Child.id == child_id).first()
+        if child is None:
+            raise LookupError(child_id)
+        raise InsufficientFunds(child.name, child.balance)
+
+    transaction = Transaction(child_id=child_id,
+                              amount=amount,
+                              description=description,
+                              category=category)
+    db.add(transaction)
+    db.flush()
+    # SQLite returns the pre-affinity value, e.g. 10 instead of 10.0
+    return row.name, float(row.balance), transaction
+
+
+def set_balance(db: Session, child_id: int, new_balance: float,
+                description: str, category: str) -> float:
+    """
+    Moves a balance to an exact value, recording the difference. The
+    row is locked while the difference is worked out, so deposits
+    landing at the same time are not lost from the ledger.
+    Raises LookupError for an unknown child.
+    """
+    current = db.query(Child.balance).filter(
+        Child.id == child_id).with_for_update().first()
+    if current is None:
+        raise LookupError(child_id)
+    _, balance, _ = apply_to_balance(db, child_id,
+                                     new_balance - current.balance,
+                                     description, category)
+    return balance
+
+
+def pay_out(db: Session, payouts: Dict[int, Tuple[float, str]]):
+    """
+    Credits several children at once, {child_id: (amount, description)},
+    with one UPDATE for the balances and one INSERT for the ledger.
+    """
+    if not payouts:
+        return
+    amounts = {child_id: amount
+               for child_id, (amount, _) in payouts.items()}
+    db.execute(
+        update(Child).where(Child.id.in_(amounts)).values(
+            balance=Child.balance + case(amounts, value=Child.id)
+        ).execution_options(synchronize_session=False)
+    )
+    db.execute(insert(Transaction), [
+        {"child_id": child_id, "amount": amount,
+         "description": description, "category": "Pocket Money"}
+        for child_id, (amount, description) in payouts.items()])
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from passlib.context import CryptContext
+
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+# Calls allowed to wait for a worker before new ones are refused
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "8"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_lock = threading.Lock()
+_pending = 0
+_timings = {}
+
+
+class PasswordPoolBusy(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+        return _pool
+
+
+def _replace_pool(broken: ProcessPoolExecutor):
+    """
+    Drops a pool that lost a worker (e.g. OOM-killed); it never
+    recovers. Only the first caller to notice replaces it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_password_pool():
+    """Called from the app lifespan on shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _record(op: str, seconds: float):
+    timing = _timings.setdefault(op, {"count": 0, "total_ms": 0.0,
+                                      "max_ms": 0.0})
+    ms = seconds * 1000
+    timing["count"] += 1
+    timing["total_ms"] += ms
+    timing["max_ms"] = max(timing["max_ms"], ms)
+
+
+async def _run(op: str, fn, *args):
+    """
+    Runs one bcrypt call on the process pool, keeping the GIL of the
+    request worker free. A broken pool is replaced and the call retried
+    once. Raises PasswordPoolBusy instead of queueing without bound.
+    """
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_WORKERS + PASSWORD_QUEUE_MAX:
+            raise PasswordPoolBusy()
+        _pending += 1
+
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        pool = _get_pool()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            logger.warning(f"Password pool broken during {op}, "
+                           f"starting a new one")
+            _replace_pool(pool)
+            return await loop.run_in_executor(_get_pool(), fn, *args)
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _pending -= 1
+            _record(op, elapsed)
+        logger.debug(f"Password {op} took {elapsed * 1000:.0f}ms")
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", _hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run("verify", _verify, password, hashed)
+
+
+def password_stats():
+    """Pool load and per-operation timings (including queue wait)."""
+    with _lock:
+        return {
+            "max_workers": PASSWORD_WORKERS,
+            "queue_max": PASSWORD_QUEUE_MAX,
+            "pending": _pending,
+            "timings": {op: {**t, "avg_ms": t["total_ms"] / t["count"]}
+                        for op, t in _timings.items()}
+        }
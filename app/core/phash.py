@@ -0,0 +1,82 @@
+import io
+from collections import defaultdict
+from typing import Iterator, List, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+# dHash grid: 8x8 comparisons give a 64-bit hash
+HASH_SIZE = 8
+
+
+def dhash(data: bytes, hash_size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of an image: shrinks it to a (size + 1) x size
+    grayscale grid and sets one bit per pixel brighter than its right
+    neighbour. Re-compressed, resized or slightly edited copies end up
+    a few bits apart. Unsigned, hash_size ** 2 bits.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        # JPEGs are decoded at 1/2-1/8 scale, the grid is tiny anyway
+        img.draft("L", (hash_size * 8, hash_size * 8))
+        img = ImageOps.exif_transpose(img)
+        small = img.convert("L").resize((hash_size + 1, hash_size),
+                                        Image.LANCZOS)
+        pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] >
+                                    pixels[offset + col + 1])
+    return value
+
+
+def to_signed(value: int) -> int:
+    """Maps an unsigned 64-bit hash onto a BIGINT column."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_signed(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _bands(count: int, bits: int) -> List[Tuple[int, int]]:
+    """(shift, mask) of `count` near-equal slices of a `bits`-bit hash."""
+    bands, shift = [], 0
+    for i in range(count):
+        width = bits // count + (1 if i < bits % count else 0)
+        bands.append((shift, (1 << width) - 1))
+        shift += width
+    return bands
+
+
+def near_pairs(values: Sequence[int], max_distance: int,
+               bits: int = HASH_SIZE ** 2) -> Iterator[Tuple[int, int]]:
+    """
+    Index pairs (i, j), i < j, of hashes at most max_distance bits
+    apart, by multi-index hashing: the hashes are cut into
+    max_distance + 1 bands, and two hashes that close must agree on at
+    least one whole band (pigeonhole). Only hashes sharing a band value
+    are compared, instead of every pair.
+    """
+    bands = _bands(min(max_distance + 1, bits), bits)
+    for band, (shift, mask) in enumerate(bands):
+        buckets = defaultdict(list)
+        for index, value in enumerate(values):
+            buckets[(value >> shift) & mask].append(index)
+        for members in buckets.values():
+            for x, i in enumerate(members):
+                a = values[i]
+                for j in members[x + 1:]:
+                    b = values[j]
+                    if hamming(a, b) > max_distance:
+                        continue
+                    # Found once, through the first band they share
+                    diff = a ^ b
+                    if all((diff >> s) & m for s, m in bands[:band]):
+                        yield i, j
@@ -0,0 +1,177 @@
+import base64
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.photo_model import Photo, Comment, month_day_of
+from app.models.user_models import User
+
+RECENT_COMMENT_LIMIT = 3
+
+# "On this day" pages, as photo ids, for the current UTC date only
+_on_this_day_cache: Dict[Tuple, Tuple[List[int], Optional[str]]] = {}
+_on_this_day_date: Optional[date] = None
+_on_this_day_lock = threading.Lock()
+
+
+def fetch_recent_comments(
+        db: Session,
+        photo_ids: List[int],
+        per_photo: int = RECENT_COMMENT_LIMIT
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Returns the last `per_photo` comments for every photo in one query,
+    using ROW_NUMBER() partitioned by photo. Comments are returned
+    oldest first, matching the order the feed has always shown.
+    """
+    if not photo_ids:
+        return {}
+
+    ranked = select(
+        Comment.photo_id,
+        Comment.user_id,
+        Comment.text,
+        func.row_number().over(
+            partition_by=Comment.photo_id,
+            order_by=(Comment.timestamp.desc(), Comment.id.desc())
+        ).label("rn")
+    ).where(Comment.photo_id.in_(photo_ids)).subquery()
+
+    rows = db.query(
+        ranked.c.photo_id,
+        User.username,
+        ranked.c.text
+    ).join(User, User.id == ranked.c.user_id) \
+        .filter(ranked.c.rn <= per_photo) \
+        .order_by(ranked.c.photo_id, ranked.c.rn.desc()) \
+        .all()
+
+    grouped = defaultdict(list)
+    for photo_id, username, text in rows:
+        grouped[photo_id].append({"username": username, "text": text})
+    return grouped
+
+
+def encode_feed_cursor(timestamp: datetime, photo_id: int) -> str:
+    """Packs the (timestamp, id) of the last photo on a page."""
+    raw = f"{timestamp.isoformat()}|{photo_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_feed_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Reverses `encode_feed_cursor`.
+    Raises ValueError for anything that is not a cursor we issued.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        ts_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts_part), int(id_part)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def paginate_by_keyset(query,
+                       limit: int,
+                       cursor: Optional[str] = None,
+                       order_by=Photo.timestamp):
+    """
+    Applies newest-first keyset pagination to a Photo query, by upload
+    time or by `order_by` (e.g. Photo.taken_at).
+
+    Seeks past the cursor position with a (time, id) row comparison
+    instead of OFFSET, so every page costs the same and concurrent
+    uploads cannot shift items between pages.
+    Returns (photos, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        ts, photo_id = decode_feed_cursor(cursor)
+        query = query.filter(
+            tuple_(order_by, Photo.id) < tuple_(ts, photo_id))
+
+    # Fetch one extra row to find out whether another page exists
+    rows = query.order_by(order_by.desc(),
+                          Photo.id.desc()).limit(limit + 1).all()
+    photos = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit and photos:
+        last = photos[-1]
+        next_cursor = encode_feed_cursor(getattr(last, order_by.key),
+                                         last.id)
+    return photos, next_cursor
+
+
+def comment_thread_page(db: Session,
+                        photo_id: int,
+                        limit: int,
+                        cursor: Optional[str] = None):
+    """
+    One page of a photo's comments, oldest first, with authors joined
+    in. Seeks on (timestamp, id) through ix_photo_comments_thread, with
+    the same cursor format as the feed.
+    Returns (comments, next_cursor); next_cursor is None on the last page.
+    """
+    query = db.query(Comment).options(joinedload(Comment.user)).filter(
+        Comment.photo_id == photo_id)
+    if cursor:
+        ts, comment_id = decode_feed_cursor(cursor)
+        query = query.filter(
+            tuple_(Comment.timestamp, Comment.id) > tuple_(ts, comment_id))
+
+    rows = query.order_by(Comment.timestamp,
+                          Comment.id).limit(limit + 1).all()
+    comments = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit and comments:
+        last = comments[-1]
+        next_cursor = encode_feed_cursor(last.timestamp, last.id)
+    return comments, next_cursor
+
+
+def on_this_day_page(db: Session,
+                     today: date,
+                     limit: int,
+                     cursor: Optional[str] = None
+                     ) -> Tuple[List[int], Optional[str]]:
+    """
+    Ids of photos taken on today's month/day in earlier years, newest
+    first by capture time, via the (month_day, taken_at, id) index.
+
+    Pages are cached until the date changes: the set only changes when
+    a backdated photo is added or a capture time is read, and whatever
+    does so must call `invalidate_on_this_day`.
+    Ids rather than rendered photos are cached so stats stay live.
+    """
+    global _on_this_day_date
+    key = (limit, cursor)
+    with _on_this_day_lock:
+        if _on_this_day_date != today:
+            _on_this_day_cache.clear()
+            _on_this_day_date = today
+        if key in _on_this_day_cache:
+            return _on_this_day_cache[key]
+
+    query = db.query(Photo).filter(
+        Photo.month_day == month_day_of(today),
+        Photo.taken_at < datetime(today.year, 1, 1)
+    )
+    photos, next_cursor = paginate_by_keyset(query, limit, cursor,
+                                             order_by=Photo.taken_at)
+    page = ([p.id for p in photos], next_cursor)
+
+    with _on_this_day_lock:
+        if _on_this_day_date == today:
+            _on_this_day_cache[key] = page
+    return page
+
+
+def invalidate_on_this_day():
+    with _on_this_day_lock:
+        _on_this_day_cache.clear()
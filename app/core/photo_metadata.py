@@ -0,0 +1,140 @@
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Optional
+
+from PIL import Image
+from sqlalchemy.orm import Session
+
+from app.core import response_cache
+from app.core.photo_feed import invalidate_on_this_day
+from app.core.storage import read_object_head
+from app.database.database import SessionLocal
+from app.models.photo_model import Photo
+
+
+logger = logging.getLogger(__name__)
+
+# JPEG keeps EXIF in an APP1 segment capped at 64 KiB right after the
+# start marker, so the first few hundred KiB always hold the header
+EXIF_HEADER_BYTES = int(os.getenv("EXIF_HEADER_BYTES", str(256 * 1024)))
+METADATA_BACKFILL_BATCH = int(os.getenv("METADATA_BACKFILL_BATCH", "50"))
+
+_EXIF_IFD = 0x8769
+_TAG_MAKE = 271
+_TAG_MODEL = 272
+_TAG_ORIENTATION = 274
+_TAG_DATETIME = 306
+_TAG_DATETIME_ORIGINAL = 36867
+_CAMERA_MAX_LENGTH = 100
+
+
+def _parse_exif_time(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value.strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _camera(make, model) -> Optional[str]:
+    make = make.strip("\x00 ") if isinstance(make, str) else ""
+    model = model.strip("\x00 ") if isinstance(model, str) else ""
+    # Most models already start with the maker, e.g. "Canon EOS R6"
+    camera = model if model.startswith(make) else f"{make} {model}".strip()
+    return camera[:_CAMERA_MAX_LENGTH] or None
+
+
+def parse_metadata(head: bytes) -> Dict[str, Any]:
+    """
+    Photo column values from the first bytes of an image file. Only
+    the header is parsed, pixels are never decoded.
+    Returns {} when the bytes are not a readable image.
+    """
+    try:
+        with Image.open(io.BytesIO(head)) as img:
+            width, height = img.size
+            try:
+                exif = img.getexif()
+                exif_ifd = exif.get_ifd(_EXIF_IFD)
+            except Exception:
+                # e.g. PNG keeps EXIF after the pixel data we did not read
+                exif, exif_ifd = {}, {}
+    except Exception:
+        return {}
+
+    metadata = {
+        "width": width,
+        "height": height,
+        "orientation": exif.get(_TAG_ORIENTATION),
+        "camera": _camera(exif.get(_TAG_MAKE), exif.get(_TAG_MODEL)),
+    }
+    taken_at = _parse_exif_time(exif_ifd.get(_TAG_DATETIME_ORIGINAL)) or \
+        _parse_exif_time(exif.get(_TAG_DATETIME))
+    if taken_at:
+        metadata["taken_at"] = taken_at
+    return metadata
+
+
+def read_metadata(stream: BinaryIO) -> Dict[str, Any]:
+    """Parses an upload's header and rewinds it for storage."""
+    head = stream.read(EXIF_HEADER_BYTES)
+    stream.seek(0)
+    return parse_metadata(head)
+
+
+def read_stored_metadata(key: str) -> Dict[str, Any]:
+    """Parses a stored object's header, fetched with a ranged GET."""
+    return parse_metadata(read_object_head(key, EXIF_HEADER_BYTES))
+
+
+def backfill_photo_metadata(
+        db: Optional[Session] = None,
+        batch_size: int = METADATA_BACKFILL_BATCH) -> int:
+    """
+    Scheduled job: fills the EXIF columns of photos stored before they
+    existed (or uploaded directly to the bucket). Only each object's
+    header is downloaded. Unreadable images get width 0 so they are not
+    retried; storage errors are retried on the next run.
+    Returns the number of photos updated.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    updated = 0
+    backdated = False
+    last_id = 0
+    try:
+        while True:
+            photos = db.query(Photo).filter(
+                Photo.width.is_(None),
+                Photo.id > last_id
+            ).order_by(Photo.id).limit(batch_size).all()
+            if not photos:
+                break
+
+            for photo in photos:
+                last_id = photo.id
+                try:
+                    metadata = read_stored_metadata(photo.minio_key)
+                except Exception as e:
+                    logger.error(f"Metadata read failed for photo "
+                                 f"{photo.id}: {e}")
+                    continue
+                for column, value in (metadata or {"width": 0,
+                                                   "height": 0}).items():
+                    setattr(photo, column, value)
+                # Capture dates move photos between "on this day" pages
+                backdated = backdated or "taken_at" in metadata
+                updated += 1
+            db.commit()
+    finally:
+        if own_session:
+            db.close()
+
+    if updated:
+        response_cache.invalidate(response_cache.PHOTOS)
+    if backdated:
+        invalidate_on_this_day()
+    return updated
@@ -0,0 +1,71 @@
+from typing import Dict
+
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.photo_model import Like, PhotoStats
+
+STAT_FIELDS = ("likes", "comments", "views")
+
+
+def dialect_insert(db: Session, model):
+    """INSERT construct that supports ON CONFLICT for the bound dialect."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"No upsert support for {dialect}")
+
+
+def bump_stats(db: Session, deltas: Dict[int, Dict[str, int]]):
+    """
+    Adds to the counters of many photos with one upsert, creating
+    missing photo_stats rows. e.g. {12: {"likes": 1}, 13: {"views": 4}}
+    Runs in the caller's transaction.
+    """
+    if not deltas:
+        return
+    rows = [{"photo_id": photo_id,
+             **{field: delta.get(field, 0) for field in STAT_FIELDS}}
+            for photo_id, delta in deltas.items()]
+
+    stmt = dialect_insert(db, PhotoStats).values(rows)
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[PhotoStats.photo_id],
+        set_={field: getattr(PhotoStats, field) + getattr(excluded, field)
+              for field in STAT_FIELDS}
+    ))
+
+
+def toggle_like(db: Session, photo_id: int, user_id: int) -> bool:
+    """
+    Likes or unlikes without a read-then-write race: a DELETE ...
+    RETURNING removes an existing like, otherwise an INSERT ... ON
+    CONFLICT DO NOTHING adds one. The counter only moves when a row
+    really changed. Returns True if the photo is now liked.
+    Raises LookupError if the photo does not exist.
+    """
+    removed = db.execute(
+        delete(Like).where(Like.photo_id == photo_id,
+                           Like.user_id == user_id).returning(Like.id)
+    ).first()
+    if removed:
+        bump_stats(db, {photo_id: {"likes": -1}})
+        return False
+
+    stmt = dialect_insert(db, Like).values(photo_id=photo_id,
+                                           user_id=user_id)
+    try:
+        added = db.execute(stmt.on_conflict_do_nothing(
+            index_elements=[Like.photo_id, Like.user_id]
+        ).returning(Like.id)).first()
+    except IntegrityError as e:
+        raise LookupError(f"Photo {photo_id} not found") from e
+
+    if added:
+        bump_stats(db, {photo_id: {"likes": 1}})
+    return True
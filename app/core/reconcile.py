@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.deletions import enqueue_deletions
+from app.core.derivatives import DERIVATIVE_SIZES
+from app.core.storage import get_backend
+from app.core.storage_backends import ObjectStat
+from app.database.database import SessionLocal
+from app.models.photo_model import Photo, PendingDeletion, StoredObject
+from app.models.user_models import User
+
+
+logger = logging.getLogger(__name__)
+
+# Objects younger than this are never orphans: uploads write the object
+# before the row that points at it is committed
+RECONCILE_GRACE_HOURS = int(os.getenv("RECONCILE_GRACE_HOURS", "24"))
+# Deletion is opt-in: by default orphans are only reported (and
+# logged), "true" queues them for deletion
+RECONCILE_DELETE = os.getenv("RECONCILE_DELETE",
+                             "false").lower() == "true"
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "1000"))
+# Keys listed per category in the report, the counts are always full
+RECONCILE_SAMPLE_SIZE = 100
+
+_DERIVATIVE_SUFFIXES = tuple(f"_{size}" for size in DERIVATIVE_SIZES)
+
+_lock = threading.Lock()
+_last_report: Optional[dict] = None
+_total_reclaimed = 0
+
+
+def _stem(key: str) -> str:
+    """
+    Key without its extension, or the original's for a derivative.
+    e.g. 'abc_thumb.webp' -> 'abc', 'abc.jpg' -> 'abc'
+    """
+    stem = key.rsplit(".", 1)[0]
+    for suffix in _DERIVATIVE_SUFFIXES:
+        if stem.endswith(suffix):
+            return stem[:-len(suffix)]
+    return stem
+
+
+def _referenced_keys(db: Session) -> Tuple[Set[str], Set[str], Set[str]]:
+    """
+    Snapshot of what the database points at, taken before the listing
+    so rows committed during the scan are not reported missing.
+    Returns (photo keys, avatar keys, queued keys).
+    """
+    photo_keys = {key for (key,) in
+                  db.query(Photo.minio_key).yield_per(5000)}
+    avatar_keys = {key for (key,) in db.query(User.profile_photo_key)
+                   .filter(User.profile_photo_key.isnot(None))}
+    queued = {key for (key,) in db.query(PendingDeletion.key)}
+    return photo_keys, avatar_keys, queued
+
+
+def _batches(listing: Iterator[Tuple[str, ObjectStat]],
+             size: int) -> Iterator[List[Tuple[str, ObjectStat]]]:
+    while True:
+        batch = list(islice(listing, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _still_unreferenced(db: Session, keys: List[str]) -> List[str]:
+    """
+    Re-checks orphans against the live tables, in case an upload of
+    the same bytes started referencing one since the snapshot.
+    """
+    stems = {_stem(key) for key in keys}
+    live = {key for (key,) in db.query(Photo.minio_key).filter(
+        or_(*[Photo.minio_key.like(f"{stem}.%") for stem in stems]))}
+    live |= {key for (key,) in db.query(User.profile_photo_key).filter(
+        User.profile_photo_key.in_(keys))}
+    live_stems = {_stem(key) for key in live}
+    return [key for key in keys if _stem(key) not in live_stems]
+
+
+def _queue_orphans(db: Session, keys: List[str]) -> List[str]:
+    """
+    Queues orphans on the deletion queue and drops their content rows,
+    so a later upload of the same bytes stores them again.
+    Returns the keys queued.
+    """
+    keys = _still_unreferenced(db, keys)
+    if keys:
+        db.query(StoredObject).filter(StoredObject.key.in_(keys)) \
+            .delete(synchronize_session=False)
+        enqueue_deletions(db, keys)
+    db.commit()
+    return keys
+
+
+def reconcile_storage(db: Optional[Session] = None,
+                      delete: bool = RECONCILE_DELETE,
+                      grace_hours: int = RECONCILE_GRACE_HOURS,
+                      batch_size: int = RECONCILE_BATCH_SIZE) -> dict:
+    """
+    Scheduled job: streams the bucket listing and checks it in batches
+    against a set index of `photos.minio_key` (with derivatives) and
+    `users.profile_photo_key`.
+    Objects nobody references and older than the grace period are
+    orphans; with `delete` they go through the deletion queue,
+    otherwise they are only logged and listed. Photos
+    and avatars whose object is not in the bucket are reported.
+    Returns the report, also kept for `reconcile_report()`.
+    """
+    global _last_report, _total_reclaimed
+    own_session = db is None
+    db = db or SessionLocal()
+    started = datetime.now(timezone.utc)
+    cutoff = started - timedelta(hours=grace_hours)
+    report = {
+        "started_at": started.isoformat(),
+        "objects": 0,
+        "bytes": 0,
+        "orphans": 0,
+        "orphan_bytes": 0,
+        "reclaimed_bytes": 0,
+        "orphan_keys": [],
+        "missing": 0,
+        "missing_photo_ids": [],
+        "missing_avatar_user_ids": [],
+    }
+    try:
+        # 1. Set index of referenced keys; derivatives match by stem
+        photo_keys, avatar_keys, queued = _referenced_keys(db)
+        live_stems = {_stem(key) for key in photo_keys}
+        unseen = photo_keys | avatar_keys
+
+        # 2. One pass over the listing, a batch of keys at a time
+        listing = get_backend().list_objects()
+        for batch in _batches(listing, batch_size):
+            orphans = []
+            for key, stat in batch:
+                report["objects"] += 1
+                report["bytes"] += stat.size
+                unseen.discard(key)
+                if key in avatar_keys or key in queued or \
+                        _stem(key) in live_stems:
+                    continue
+                modified = stat.last_modified
+                if modified and modified.tzinfo is None:
+                    modified = modified.replace(tzinfo=timezone.utc)
+                if modified and modified > cutoff:
+                    continue
+                orphans.append((key, stat.size))
+
+            report["orphans"] += len(orphans)
+            report["orphan_bytes"] += sum(size for _, size in orphans)
+            report["orphan_keys"] += [key for key, _ in orphans]
+            del report["orphan_keys"][RECONCILE_SAMPLE_SIZE:]
+            if delete and orphans:
+                sizes = dict(orphans)
+                done = _queue_orphans(db, list(sizes))
+                report["reclaimed_bytes"] += sum(sizes[k] for k in done)
+            elif orphans:
+                # Dry run: what a run with RECONCILE_DELETE would remove
+                for key, size in orphans:
+                    logger.info(f"Reconciliation would delete orphan "
+                                f"{key} ({size} bytes)")
+
+        # 3. Rows whose object was never listed
+        missing_photos = unseen & photo_keys
+        missing_avatars = unseen & avatar_keys
+        report["missing"] = len(unseen)
+        if missing_photos:
+            report["missing_photo_ids"] = [pid for (pid,) in db.query(
+                Photo.id).filter(Photo.minio_key.in_(
+                    list(missing_photos)[:RECONCILE_SAMPLE_SIZE]))]
+        if missing_avatars:
+            report["missing_avatar_user_ids"] = [uid for (uid,) in db.query(
+                User.id).filter(User.profile_photo_key.in_(
+                    list(missing_avatars)[:RECONCILE_SAMPLE_SIZE]))]
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Storage reconciliation failed: {e}")
+        report["error"] = str(e)
+    finally:
+        if own_session:
+            db.close()
+
+    report["finished_at"] = datetime.now(timezone.utc).isoformat()
+    if report["orphans"] or report["missing"]:
+        logger.warning(
+            f"Reconciliation: {report['orphans']} orphans "
+            f"({report['orphan_bytes']} bytes, "
+            f"{report['reclaimed_bytes']} reclaimed), "
+            f"{report['missing']} rows with missing objects")
+    with _lock:
+        _total_reclaimed += report["reclaimed_bytes"]
+        _last_report = report
+    return report
+
+
+def reconcile_report() -> dict:
+    """The last run's report and the bytes reclaimed since startup."""
+    with _lock:
+        return {"last_run": _last_report,
+                "total_reclaimed_bytes": _total_reclaimed,
+                "grace_hours": RECONCILE_GRACE_HOURS,
+                "delete": RECONCILE_DELETE}
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import redis
+except ImportError:  # optional, only needed when REDIS_URL is set
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# Upper bound on staleness if an invalidation is ever missed
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Scopes invalidated together; each cached endpoint belongs to one
+PHOTOS = "photos"
+ALBUMS = "albums"
+USERS = "users"
+# Duplicate photo groups; only uploads, deletes and hashing change them
+DUPLICATES = "duplicates"
+
+
+class LRUBackend:
+    """In-process cache. Each worker process keeps its own copy."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, scope: str) -> int:
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def bump(self, scope: str):
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+
+class RedisBackend:
+    """Shared cache, so invalidations reach every worker."""
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(f"response:{key}")
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self._client.set(f"response:{key}", value, ex=ttl)
+
+    def generation(self, scope: str) -> int:
+        return int(self._client.get(f"response-gen:{scope}") or 0)
+
+    def bump(self, scope: str):
+        self._client.incr(f"response-gen:{scope}")
+
+
+def _make_backend():
+    if REDIS_URL:
+        if redis is not None:
+            return RedisBackend(REDIS_URL)
+        logger.warning("REDIS_URL is set but redis is not installed, "
+                       "using the in-process response cache")
+    return LRUBackend()
+
+
+backend = _make_backend()
+
+
+def cache_key(scope: str, request: Request, vary: str = "") -> str:
+    """
+    Scope generation + path + sorted query string (+ `vary` for inputs
+    that are not in the URL, like today's date). Bumping the generation
+    on invalidation makes every older key unreachable.
+    """
+    query = "&".join(f"{k}={v}" for k, v in
+                     sorted(request.query_params.multi_items()))
+    generation = backend.generation(scope)
+    return f"{scope}:{generation}:{vary}:{request.url.path}?{query}"
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in header.split(",")]
+
+
+def _response(request: Request, etag: str, body: bytes) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json",
+                    headers=headers)
+
+
+def _unpack(value: bytes) -> Tuple[str, bytes]:
+    etag, body = value.split(b"\n", 1)
+    return etag.decode(), body
+
+
+def cached(key: str, request: Request) -> Optional[Response]:
+    """
+    The cached response for `key` (a 304 if the client already has it),
+    or None on a miss. Call before touching the database.
+    """
+    try:
+        value = backend.get(key)
+    except Exception as e:
+        logger.error(f"Response cache read failed: {e}")
+        return None
+    if value is None:
+        return None
+    etag, body = _unpack(value)
+    return _response(request, etag, body)
+
+
+def store(key: str, request: Request, data) -> Response:
+    """Serialises `data`, caches it under `key` and returns it."""
+    body = json.dumps(jsonable_encoder(data)).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    try:
+        backend.set(key, etag.encode() + b"\n" + body, RESPONSE_CACHE_TTL)
+    except Exception as e:
+        logger.error(f"Response cache write failed: {e}")
+    return _response(request, etag, body)
+
+
+def invalidate(*scopes: str):
+    """Called after a commit that changes what a scope renders."""
+    for scope in scopes:
+        try:
+            backend.bump(scope)
+        except Exception as e:
+            logger.error(f"Response cache invalidation failed: {e}")
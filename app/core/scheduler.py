@@ -1,10 +1,15 @@
 # app/core/scheduler.py
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import date
+from datetime import date, datetime
 from sqlalchemy.orm import Session
 from app.database.database import SessionLocal
-from app.models.user_models import Child, Transaction
+from app.models.user_models import Child
+from app.core.ledger import pay_out
+from app.core.view_buffer import flush_views, VIEW_FLUSH_SECONDS
+from app.core.photo_metadata import backfill_photo_metadata
+from app.core.deletions import drain_deletions, DELETE_DRAIN_SECONDS
+from app.core.reconcile import reconcile_storage
 
 
 logger = logging.getLogger(__name__)
@@ -30,25 +35,20 @@ def run_weekly_payout():
     """Scheduled task: Runs every Friday @ 07:30"""
     db: Session = SessionLocal()
     try:
-        children = db.query(Child).all()
-        for child in children:
-            if not child.birth_date:
-                continue
-
+        payouts = {}
+        for child_id, birth_date in db.query(
+                Child.id, Child.birth_date).filter(
+                Child.birth_date.isnot(None)):
             # This call is now safe because reference_date defaults to None
-            age = calculate_age(child.birth_date)
+            age = calculate_age(birth_date)
             payout_amount = age * 0.5
 
             if payout_amount > 0:
-                child.balance += payout_amount
-                new_trans = Transaction(
-                    child_id=child.id,
-                    amount=payout_amount,
-                    description=f"Weekly Pocket Money (Age {age})",
-                    category="Pocket Money"
-                )
-                db.add(new_trans)
+                payouts[child_id] = (payout_amount,
+                                     f"Weekly Pocket Money (Age {age})")
 
+        # Balances are incremented in SQL, never read and written back
+        pay_out(db, payouts)
         db.commit()
     finally:
         db.close()
@@ -63,5 +63,24 @@ def start_scheduler():
                       day_of_week='fri',
                       hour=7,
                       minute=30)
+    # Write-behind flush of buffered photo views
+    scheduler.add_job(flush_views,
+                      'interval',
+                      seconds=VIEW_FLUSH_SECONDS)
+    # Storage cleanup queued by photo deletes, retried until it succeeds
+    scheduler.add_job(drain_deletions,
+                      'interval',
+                      seconds=DELETE_DRAIN_SECONDS)
+    # EXIF for photos stored before it was read on upload; runs once at
+    # startup, then hourly to catch direct uploads it could not read
+    scheduler.add_job(backfill_photo_metadata,
+                      'interval',
+                      hours=1,
+                      next_run_time=datetime.now())
+    # Bucket vs database check, queues orphaned objects; daily at 03:15
+    scheduler.add_job(reconcile_storage,
+                      'cron',
+                      hour=3,
+                      minute=15)
     scheduler.start()
     logger.info("Pocket Money Scheduler started - Next run: Friday at 07:30")
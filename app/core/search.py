@@ -0,0 +1,166 @@
+import os
+import re
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.photo_stats import dialect_insert
+from app.models.photo_model import Album, Comment, Photo, PhotoSearch
+
+# Postgres text search configuration (stemming and stop words)
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "english")
+# Queries without a word this long are matched by substring (trigram)
+# instead: stemming and stop words make full-text search miss them
+SEARCH_FTS_MIN_LENGTH = int(os.getenv("SEARCH_FTS_MIN_LENGTH", "4"))
+
+# bm25() weights for the FTS5 columns, mirroring the A/B/C weights
+_FTS5_WEIGHTS = "10.0, 5.0, 1.0"
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def _documents(db: Session, photo_ids: List[int]):
+    """(photo_id, caption, album title, comments) for each photo."""
+    comments = defaultdict(list)
+    for photo_id, body in db.query(Comment.photo_id, Comment.text).filter(
+            Comment.photo_id.in_(photo_ids)).order_by(Comment.id):
+        comments[photo_id].append(body)
+
+    rows = db.query(Photo.id, Photo.caption, Album.title) \
+        .outerjoin(Album, Album.id == Photo.album_id) \
+        .filter(Photo.id.in_(photo_ids))
+    return [(photo_id, caption or "", title or "",
+             "\n".join(comments[photo_id]))
+            for photo_id, caption, title in rows]
+
+
+def _weighted(value: str, weight: str):
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, value), weight)
+
+
+def refresh_search(db: Session, photo_ids: List[int]):
+    """
+    Rebuilds the search entries of photos in the caller's transaction.
+    Call it after a caption, comment or album change.
+    """
+    photo_ids = list(set(photo_ids))
+    if not photo_ids:
+        return
+    db.flush()
+    docs = _documents(db, photo_ids)
+    if not docs:
+        return
+    postgres = _dialect(db) == "postgresql"
+
+    rows = []
+    for photo_id, caption, title, comments in docs:
+        row = {"photo_id": photo_id,
+               "document": "\n".join(filter(None, (caption, title,
+                                                   comments)))}
+        if postgres:
+            row["search_vector"] = _weighted(caption, "A").op("||")(
+                _weighted(title, "B")).op("||")(_weighted(comments, "C"))
+        rows.append(row)
+
+    stmt = dialect_insert(db, PhotoSearch).values(rows)
+    update = {"document": stmt.excluded.document}
+    if postgres:
+        update["search_vector"] = stmt.excluded.search_vector
+    db.execute(stmt.on_conflict_do_update(index_elements=["photo_id"],
+                                          set_=update))
+
+    if not postgres:
+        _remove_fts(db, photo_ids)
+        db.execute(text(
+            "INSERT INTO photo_search_fts (rowid, caption, album, comments) "
+            "VALUES (:photo_id, :caption, :album, :comments)"),
+            [{"photo_id": photo_id, "caption": caption, "album": title,
+              "comments": comments}
+             for photo_id, caption, title, comments in docs])
+
+
+def _remove_fts(db: Session, photo_ids: List[int]):
+    db.execute(text("DELETE FROM photo_search_fts WHERE rowid = :photo_id"),
+               [{"photo_id": photo_id} for photo_id in photo_ids])
+
+
+def remove_from_search(db: Session, photo_ids: List[int]):
+    """Drops the entries of photos about to be deleted."""
+    if not photo_ids:
+        return
+    db.execute(delete(PhotoSearch).where(PhotoSearch.photo_id.in_(
+        photo_ids)).execution_options(synchronize_session=False))
+    if _dialect(db) == "sqlite":
+        _remove_fts(db, photo_ids)
+
+
+def _postgres_ids(db: Session, terms: List[str], query: str,
+                  full_text: bool, limit: int, offset: int):
+    if full_text:
+        # Every word must match, the last one as a prefix while typing
+        tsquery = func.to_tsquery(SEARCH_CONFIG, " & ".join(
+            terms[:-1] + [terms[-1] + ":*"]))
+        stmt = select(PhotoSearch.photo_id).where(
+            PhotoSearch.search_vector.op("@@")(tsquery)
+        ).order_by(func.ts_rank_cd(PhotoSearch.search_vector,
+                                   tsquery).desc(),
+                   PhotoSearch.photo_id.desc())
+    else:
+        # ILIKE is served by the gin_trgm_ops index
+        stmt = select(PhotoSearch.photo_id).where(
+            PhotoSearch.document.icontains(query, autoescape=True)
+        ).order_by(func.word_similarity(query,
+                                        PhotoSearch.document).desc(),
+                   PhotoSearch.photo_id.desc())
+    return db.execute(stmt.limit(limit).offset(offset)).scalars().all()
+
+
+def _sqlite_ids(db: Session, terms: List[str], query: str,
+                full_text: bool, limit: int, offset: int):
+    if full_text:
+        match = " ".join(f'"{term}"*' for term in terms)
+        return db.execute(text(
+            "SELECT rowid FROM photo_search_fts "
+            "WHERE photo_search_fts MATCH :match "
+            f"ORDER BY bm25(photo_search_fts, {_FTS5_WEIGHTS}), rowid DESC "
+            "LIMIT :limit OFFSET :offset"),
+            {"match": match, "limit": limit, "offset": offset}
+        ).scalars().all()
+    stmt = select(PhotoSearch.photo_id).where(
+        PhotoSearch.document.icontains(query, autoescape=True)
+    ).order_by(PhotoSearch.photo_id.desc())
+    return db.execute(stmt.limit(limit).offset(offset)).scalars().all()
+
+
+def search_photos(db: Session,
+                  query: str,
+                  limit: int,
+                  cursor: Optional[str] = None
+                  ) -> Tuple[List[int], Optional[str]]:
+    """
+    Photo ids matching `query`, best match first, and the cursor of the
+    next page. Ranks are relative to the query, so every match has to be
+    ranked anyway and the cursor is a plain offset.
+    Raises ValueError for an invalid cursor.
+    """
+    offset = int(cursor) if cursor else 0
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    terms = _terms(query)
+    if not terms:
+        return [], None
+
+    full_text = max(map(len, terms)) >= SEARCH_FTS_MIN_LENGTH
+    find = _postgres_ids if _dialect(db) == "postgresql" else _sqlite_ids
+    ids = find(db, terms, query.strip(), full_text, limit + 1, offset)
+
+    next_cursor = str(offset + limit) if len(ids) > limit else None
+    return ids[:limit], next_cursor
@@ -1,84 +1,155 @@
 import os
-from minio import Minio
-from minio.error import S3Error
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from typing import Optional
 
-# 1. INTERNAL connection (Docker to Docker)
-# Using the service name from your docker-compose
-MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
-MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "admin")
-MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "password")
+from app.core.storage_backends import (  # noqa: F401 (re-exported)
+    StorageBackend, ObjectNotFound, ObjectStat, make_backend,
+    BUCKET_NAME, EXTERNAL_URL_HOST
+)
 
-# 2. EXTERNAL address (What family phones will use)
-EXTERNAL_URL_HOST = os.getenv("EXTERNAL_URL_HOST",
-                              "ford-home-pi.local:9000")
-BUCKET_NAME = "family-photos"
 
+logger = logging.getLogger(__name__)
+
+# "minio" (default) or "local", see app/core/storage_backends.py
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "minio")
+# e.g. http://ford-home-pi.local:8005/v1/family-photos/images
+# Unset, clients download straight from the backend
+IMAGE_PROXY_URL = os.getenv("IMAGE_PROXY_URL")
+# Upper bound on concurrent storage calls made on behalf of requests
+STORAGE_MAX_WORKERS = int(os.getenv("STORAGE_MAX_WORKERS", "4"))
+
+_backend: Optional[StorageBackend] = None
 
-# Initialize using the INTERNAL Docker network
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=False
-)
+
+def get_backend() -> StorageBackend:
+    """The configured backend, created on first use (not on import)."""
+    global _backend
+    if _backend is None:
+        _backend = make_backend(STORAGE_BACKEND)
+    return _backend
+
+
+def set_backend(backend: StorageBackend):
+    """Swaps the backend, for tests and benchmarks."""
+    global _backend
+    _backend = backend
 
 
 def init_storage():
     """Ensure bucket exists on startup."""
-    try:
-        if not minio_client.bucket_exists(BUCKET_NAME):
-            minio_client.make_bucket(BUCKET_NAME)
-            print(f"✅ MinIO: Bucket '{BUCKET_NAME}' "
-                  "created successfully.")
-        else:
-            print(f"✅ MinIO: Bucket '{BUCKET_NAME}' "
-                  "already exists.")
-    except S3Error as err:
-        print(f"❌ MinIO Error initializing bucket: {err}")
+    get_backend().init()
 
 
 def upload_image_to_storage(file_name: str,
                             file_stream,
                             file_size: int = -1,
                             content_type: str = "image/jpeg"):
+    get_backend().put(file_name, file_stream, file_size, content_type)
+
+
+def read_object_head(key: str, length: int) -> bytes:
+    """First `length` bytes of an object, via a ranged GET."""
+    return get_backend().get(key, offset=0, length=length)
+
+
+class AsyncStorage:
+    """
+    Awaitable front for the blocking storage backend.
+
+    Calls run on a small dedicated thread pool so a slow MinIO queues
+    work here instead of tying up the request threadpool. `stats()`
+    reports how many calls are waiting and how many are running.
+    """
+
+    def __init__(self, max_workers: int = STORAGE_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="storage")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs any blocking storage call on the storage pool."""
+        def task():
+            with self._lock:
+                self._queued -= 1
+                self._in_flight += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        def on_done(future):
+            # Cancelled before it started, so task() never ran
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
 
-    minio_client.put_object(
-        bucket_name=BUCKET_NAME,
-        object_name=file_name,
-        data=file_stream,
-        length=file_size,
-        part_size=10 * 1024 * 1024,
-        content_type=content_type
-    )
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(task)
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    async def put_object(self, key: str, stream, size: int = -1,
+                         content_type: str = "image/jpeg"):
+        await self.run(upload_image_to_storage,
+                       key, stream, size, content_type)
+
+    async def stat_object(self, key: str) -> ObjectStat:
+        return await self.run(lambda: get_backend().stat(key))
+
+    async def read_head(self, key: str, length: int) -> bytes:
+        return await self.run(read_object_head, key, length)
+
+    async def remove_object(self, key: str):
+        await self.run(lambda: get_backend().delete(key))
+
+    async def remove_objects(self, keys):
+        """Bulk delete in one call; returns the keys that failed."""
+        return await self.run(lambda: get_backend().delete_many(keys))
+
+    async def init(self):
+        await self.run(init_storage)
+
+    def stats(self):
+        with self._lock:
+            return {"max_workers": self.max_workers,
+                    "queued": self._queued,
+                    "in_flight": self._in_flight}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async_storage = AsyncStorage()
+
+
+def get_presigned_upload_url(key: str,
+                             expires_in_minutes: int = 15):
+    """
+    Presigned PUT so a client can upload straight to the bucket.
+    Raises NotImplementedError on backends without direct uploads.
+    """
+    return get_backend().presign_put(
+        key, timedelta(minutes=expires_in_minutes))
+
+
+def get_direct_image_url(key: str):
+    return get_backend().public_url(key)
 
 
 def get_image_url(key: str):
     if not key:
         return None
-    # Return a direct public link instead of a signed one
-    return f"http://{EXTERNAL_URL_HOST}/{BUCKET_NAME}/{key}"
-
-
-def get_image_url_old(file_name: str,
-                      expires_in_hours: int = 2):
-    """Generates a secure link for the frontend."""
-    try:
-        # MinIO generates a link using its own internal endpoint
-        # (minio:9000)
-        url = minio_client.get_presigned_url(
-            "GET",
-            BUCKET_NAME,
-            file_name,
-            expires=timedelta(hours=expires_in_hours),
-        )
-
-        # We swap the internal Docker name for the external Pi address
-        # so the family's web browser can actually load the image.
-        if MINIO_ENDPOINT in url:
-            url = url.replace(MINIO_ENDPOINT, EXTERNAL_URL_HOST)
-
-        return url
-    except S3Error as err:
-        print(f"❌ MinIO Error generating URL for {file_name}: {err}")
-        return None
+    # Serve through the API's caching image endpoint when configured
+    if IMAGE_PROXY_URL:
+        return f"{IMAGE_PROXY_URL.rstrip('/')}/{key}"
+    return get_direct_image_url(key)
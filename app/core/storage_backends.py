@@ -0,0 +1,363 @@
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from minio import Minio
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+
+
+logger = logging.getLogger(__name__)
+
+# 1. INTERNAL connection (Docker to Docker)
+# Using the service name from your docker-compose
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
+MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "admin")
+MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "password")
+
+# 2. EXTERNAL address (What family phones will use)
+EXTERNAL_URL_HOST = os.getenv("EXTERNAL_URL_HOST",
+                              "ford-home-pi.local:9000")
+# Presigning is done offline, so the region must be known up front
+MINIO_REGION = os.getenv("MINIO_REGION", "us-east-1")
+BUCKET_NAME = "family-photos"
+
+# Local filesystem backend: where objects live and how clients reach
+# them (the API's /images endpoint by default)
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", "storage-data")
+STORAGE_LOCAL_URL = os.getenv("STORAGE_LOCAL_URL",
+                              "/v1/family-photos/images")
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectNotFound(Exception):
+    """The key does not exist in the backend."""
+
+
+@dataclass
+class ObjectStat:
+    size: int
+    last_modified: Optional[datetime]
+    etag: Optional[str] = None
+
+
+class StorageBackend:
+    """
+    Interface shared by the storage backends. All calls block, so
+    request handlers go through `AsyncStorage` in app.core.storage.
+    """
+
+    def init(self):
+        """Creates the bucket/directory if needed; run on startup."""
+
+    def put(self, key: str, stream: BinaryIO, size: int = -1,
+            content_type: str = "image/jpeg"):
+        raise NotImplementedError
+
+    def get(self, key: str, offset: int = 0,
+            length: Optional[int] = None) -> bytes:
+        """The object's bytes, or `length` bytes from `offset`."""
+        raise NotImplementedError
+
+    def stream(self, key: str,
+               chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def stat(self, key: str) -> ObjectStat:
+        raise NotImplementedError
+
+    def list_objects(self) -> Iterator[Tuple[str, ObjectStat]]:
+        """Every (key, stat) in the store, streamed in key order."""
+        raise NotImplementedError
+
+    def download(self, key: str, path: str):
+        """Copies the object to a local file."""
+        with open(path, "wb") as f:
+            for chunk in self.stream(key):
+                f.write(chunk)
+
+    def delete(self, key: str):
+        """Removes an object; missing keys are not an error."""
+        raise NotImplementedError
+
+    def delete_many(self, keys: List[str]) -> List[str]:
+        """Removes several objects, returns the keys that failed."""
+        failed = []
+        for key in keys:
+            try:
+                self.delete(key)
+            except Exception as e:
+                logger.error(f"Delete of {key} failed: {e}")
+                failed.append(key)
+        return failed
+
+    def presign_put(self, key: str, expires: timedelta) -> str:
+        raise NotImplementedError
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """A file that can be served as-is, for local backends only."""
+        return None
+
+
+@contextmanager
+def _not_found_as(key: str):
+    try:
+        yield
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            raise ObjectNotFound(key) from e
+        raise
+
+
+class MinioBackend(StorageBackend):
+    """Objects in a MinIO bucket. Clients are only created when used."""
+
+    def __init__(self, endpoint: str = MINIO_ENDPOINT,
+                 bucket: str = BUCKET_NAME,
+                 external_host: str = EXTERNAL_URL_HOST):
+        self.endpoint = endpoint
+        self.bucket = bucket
+        self.external_host = external_host
+        self._client = None
+        self._external_client = None
+
+    @property
+    def client(self) -> Minio:
+        # INTERNAL Docker network address
+        if self._client is None:
+            self._client = Minio(
+                self.endpoint,
+                access_key=MINIO_ACCESS_KEY,
+                secret_key=MINIO_SECRET_KEY,
+                secure=False
+            )
+        return self._client
+
+    @property
+    def external_client(self) -> Minio:
+        """
+        Client addressed at the EXTERNAL host, used only for presigning.
+        The signature covers the host, so URLs for phones have to be
+        signed for the address they will actually use, not rewritten.
+        """
+        if self._external_client is None:
+            host = self.external_host
+            self._external_client = Minio(
+                host.split("://", 1)[-1],
+                access_key=MINIO_ACCESS_KEY,
+                secret_key=MINIO_SECRET_KEY,
+                secure=host.startswith("https://"),
+                region=MINIO_REGION
+            )
+        return self._external_client
+
+    def init(self):
+        """Ensure bucket exists on startup."""
+        try:
+            if not self.client.bucket_exists(self.bucket):
+                self.client.make_bucket(self.bucket)
+                print(f"✅ MinIO: Bucket '{self.bucket}' "
+                      "created successfully.")
+            else:
+                print(f"✅ MinIO: Bucket '{self.bucket}' "
+                      "already exists.")
+        except S3Error as err:
+            print(f"❌ MinIO Error initializing bucket: {err}")
+
+    def put(self, key, stream, size=-1, content_type="image/jpeg"):
+        self.client.put_object(
+            bucket_name=self.bucket,
+            object_name=key,
+            data=stream,
+            length=size,
+            part_size=10 * 1024 * 1024,
+            content_type=content_type
+        )
+
+    def get(self, key, offset=0, length=None):
+        with _not_found_as(key):
+            response = self.client.get_object(self.bucket, key,
+                                              offset=offset,
+                                              length=length or 0)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        with _not_found_as(key):
+            response = self.client.get_object(self.bucket, key)
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    def stat(self, key):
+        with _not_found_as(key):
+            stat = self.client.stat_object(self.bucket, key)
+        return ObjectStat(stat.size, stat.last_modified, stat.etag)
+
+    def list_objects(self):
+        for obj in self.client.list_objects(self.bucket, recursive=True):
+            yield obj.object_name, ObjectStat(obj.size, obj.last_modified,
+                                              obj.etag)
+
+    def download(self, key, path):
+        with _not_found_as(key):
+            self.client.fget_object(self.bucket, key, path)
+
+    def delete(self, key):
+        self.client.remove_object(self.bucket, key)
+
+    def delete_many(self, keys):
+        # One multi-object DELETE request per 1000 keys
+        errors = self.client.remove_objects(
+            self.bucket, [DeleteObject(key) for key in keys])
+        failed = []
+        for error in errors:
+            logger.error(f"Delete of {error.name} failed: {error.message}")
+            failed.append(error.name)
+        return failed
+
+    def presign_put(self, key, expires):
+        return self.external_client.get_presigned_url(
+            "PUT", self.bucket, key, expires=expires)
+
+    def public_url(self, key):
+        # A public link straight to MinIO instead of a signed one
+        return f"http://{self.external_host}/{self.bucket}/{key}"
+
+
+class LocalBackend(StorageBackend):
+    """
+    Objects as files under one directory, for tests and single-machine
+    benchmarks. Writes land in a temporary file that is renamed into
+    place, so readers never see a partial object. Reads are
+    memory-mapped.
+    """
+
+    def __init__(self, root: str = STORAGE_LOCAL_DIR,
+                 base_url: str = STORAGE_LOCAL_URL):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid key: {key}")
+        return path
+
+    def init(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    def put(self, key, stream, size=-1, content_type="image/jpeg"):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, part = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix=".", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(stream, f, STREAM_CHUNK_SIZE)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(part, path)
+        except BaseException:
+            os.unlink(part)
+            raise
+
+    @contextmanager
+    def _mapped(self, key: str):
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Zero-length files cannot be mapped
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    def get(self, key, offset=0, length=None):
+        with self._mapped(key) as mm:
+            end = len(mm) if length is None else offset + length
+            return bytes(mm[offset:end])
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        with self._mapped(key) as mm:
+            for start in range(0, len(mm), chunk_size):
+                yield bytes(mm[start:start + chunk_size])
+
+    def stat(self, key):
+        try:
+            st = os.stat(self._path(key))
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+        return ObjectStat(
+            st.st_size,
+            datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+            f"{st.st_size:x}-{st.st_mtime_ns:x}")
+
+    def list_objects(self):
+        # A directory sorts as "name/", so the walk yields keys in the
+        # same global order as a bucket listing: "a.b" before "a/b"
+        # before "a0"
+        def walk(directory):
+            with os.scandir(directory) as entries:
+                for entry in sorted(entries, key=lambda e: e.name + "/"
+                                    if e.is_dir() else e.name):
+                    if entry.is_dir():
+                        yield from walk(entry.path)
+                    elif not entry.name.endswith(".part"):
+                        yield entry.path
+
+        for path in walk(self.root):
+            key = os.path.relpath(path, self.root).replace(os.sep, "/")
+            yield key, self.stat(key)
+
+    def download(self, key, path):
+        try:
+            # copyfile uses sendfile/copy_file_range on Linux
+            shutil.copyfile(self._path(key), path)
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def presign_put(self, key, expires):
+        raise NotImplementedError("Direct uploads need the MinIO backend")
+
+    def public_url(self, key):
+        return f"{self.base_url}/{key}"
+
+    def local_path(self, key):
+        path = self._path(key)
+        return path if os.path.isfile(path) else None
+
+
+BACKENDS = {"minio": MinioBackend, "local": LocalBackend}
+
+
+def make_backend(name: str) -> StorageBackend:
+    try:
+        return BACKENDS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown STORAGE_BACKEND '{name}', "
+                         f"expected one of {sorted(BACKENDS)}")
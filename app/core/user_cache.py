@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.user_models import User
+
+
+# Upper bound on how long a change made outside the API stays unseen
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+_principals = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """The parts of a user that authorisation checks need."""
+    id: int
+    username: str
+    role: str
+    display_name: Optional[str]
+
+
+def _load(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    row = db.query(User.id, User.username, User.role,
+                   User.display_name).filter(User.id == user_id).first()
+    return UserPrincipal(*row) if row else None
+
+
+def get_principal(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    """
+    Cached principal for `user_id`, loaded from the database on a miss
+    or once USER_CACHE_TTL has passed. Unknown ids are not cached.
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _principals.get(user_id)
+        if entry and entry[1] > now:
+            return entry[0]
+
+    principal = _load(db, user_id)
+    if principal is None:
+        return None
+
+    with _lock:
+        if len(_principals) >= USER_CACHE_SIZE:
+            # Drop expired entries first, then the oldest insertion
+            for key in [k for k, (_, exp) in _principals.items()
+                        if exp <= now]:
+                del _principals[key]
+            if len(_principals) >= USER_CACHE_SIZE:
+                del _principals[next(iter(_principals))]
+        _principals[user_id] = (principal, now + USER_CACHE_TTL)
+    return principal
+
+
+def invalidate_user(user_id: int):
+    """Called after a commit that changes a user's role or profile."""
+    with _lock:
+        _principals.pop(user_id, None)
@@ -0,0 +1,89 @@
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.photo_stats import bump_stats, dialect_insert
+from app.database.database import SessionLocal
+from app.models.photo_model import Photo, View
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled flushes of buffered views
+VIEW_FLUSH_SECONDS = int(os.getenv("VIEW_FLUSH_SECONDS", "5"))
+# Flush early once this many (photo, user) pairs are waiting
+VIEW_BUFFER_MAX = int(os.getenv("VIEW_BUFFER_MAX", "1000"))
+
+_pending = set()
+_lock = threading.Lock()
+
+
+def record_views(photo_ids: Iterable[int], user_id: int) -> int:
+    """
+    Queues views in memory; they reach the database on the next flush.
+    Returns how many pairs are now pending.
+    """
+    with _lock:
+        _pending.update((photo_id, user_id) for photo_id in photo_ids)
+        pending = len(_pending)
+
+    if pending >= VIEW_BUFFER_MAX:
+        flush_views()
+    return pending
+
+
+def flush_views(db: Optional[Session] = None) -> int:
+    """
+    Writes every buffered view with one multi-row
+    INSERT ... ON CONFLICT DO NOTHING, and bumps the view counters by
+    the rows actually inserted. Scheduled every VIEW_FLUSH_SECONDS and
+    run once more on shutdown.
+    Returns the number of new views written.
+    """
+    with _lock:
+        if not _pending:
+            return 0
+        rows = list(_pending)
+        _pending.clear()
+
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        # Skip photos deleted since they were viewed, otherwise one
+        # stale id would fail the whole batch on its foreign key
+        existing = {photo_id for (photo_id,) in db.query(Photo.id).filter(
+            Photo.id.in_({photo_id for photo_id, _ in rows}))}
+        values = [{"photo_id": photo_id, "user_id": user_id}
+                  for photo_id, user_id in rows if photo_id in existing]
+
+        inserted = []
+        if values:
+            stmt = dialect_insert(db, View).values(values)
+            inserted = db.execute(stmt.on_conflict_do_nothing(
+                index_elements=["photo_id", "user_id"]
+            ).returning(View.photo_id)).scalars().all()
+            bump_stats(db, {photo_id: {"views": n} for photo_id, n
+                            in Counter(inserted).items()})
+        db.commit()
+        # Cached feeds are deliberately not invalidated here: view
+        # counts already lag, and a flush every few seconds would keep
+        # the response cache empty. They catch up within its TTL.
+        return len(inserted)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"View flush failed, requeueing {len(rows)}: {e}")
+        with _lock:
+            _pending.update(rows)
+        return 0
+    finally:
+        if own_session:
+            db.close()
+
+
+def pending_views() -> int:
+    with _lock:
+        return len(_pending)
@@ -0,0 +1,44 @@
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.database.database import engine, Base
+from app.models import user_models, photo_model, utilities  # noqa
+
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..",
+                           "alembic.ini")
+
+
+def migrate(bind: Engine = engine, config_path: str = ALEMBIC_INI):
+    """
+    Brings the database schema up to date; run once before the app
+    starts (see the Dockerfile), never from the workers themselves.
+
+    The migration chain starts from the schema the app had before
+    migrations were introduced, so:
+    - a fresh database (no photos table) gets the current schema from
+      the models and is stamped at head;
+    - any other database is upgraded to head, which on one that was
+      never stamped runs the whole chain.
+    """
+    config = Config(config_path)
+    tables = inspect(bind).get_table_names()
+    if "photos" not in tables and "alembic_version" not in tables:
+        logger.info("Fresh database, creating tables")
+        Base.metadata.create_all(bind=bind)
+        command.stamp(config, "head")
+    else:
+        command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    # python -m app.database.migrate
+    logging.basicConfig(level=logging.INFO)
+    migrate()
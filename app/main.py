@@ -1,18 +1,25 @@
 import os
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.db_manager import db_router
 from app.api.v1.pocket_money import pocket_money_router
-from app.api.v1.family_photos import family_photos_router
+from app.api.v1.family_photos import family_photos_router, get_parent_user
 from app.api.v1.utils import utils_router
 from app.core.scheduler import start_scheduler
-from app.database.database import engine, Base
+from app.database.database import engine
 from app.models.user_models import Child, Transaction  # noqa
 from app.models.photo_model import Photo  # noqa
 from app.models.utilities import Utils  # noqa
-from app.core.storage import init_storage
+from app.core.storage import async_storage
+from app.core.image_cache import image_cache
+from app.core.derivatives import shutdown_derivative_pool
+from app.core.passwords import shutdown_password_pool, password_stats
+from app.core.reconcile import reconcile_report
+from app.core.events import (start_event_bridge, stop_event_bridge,
+                             event_bus)
+from app.core.view_buffer import flush_views
 
 
 load_dotenv()
@@ -22,18 +29,21 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     print("🚀 Starting up...")
 
-    # 1. Ensure DB tables exist (Wrap in try/except for Docker DB readiness)
-    try:
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database tables verified/created.")
-    except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-        # In a real prod environment, you might want to retry here
+    # Tables are created and migrated by `python -m app.database.migrate`
+    # before the server starts (see the Dockerfile)
 
-    init_storage()
+    # Bucket check runs on the storage pool, off the event loop
+    await async_storage.init()
     start_scheduler()
+    # Postgres LISTEN/NOTIFY fan-out of live events between workers
+    start_event_bridge(engine)
     yield
     print("🛑 Shutting down...")
+    stop_event_bridge()
+    shutdown_derivative_pool()
+    shutdown_password_pool()
+    flush_views()
+    async_storage.shutdown()
 
 
 def create_app():
@@ -59,8 +69,27 @@ def create_app():
             "version": "1.1.0"
         }
 
-    # Create all tables on startup
-    Base.metadata.create_all(bind=engine)
+    # Operational endpoints, parents only
+    @app.get("/storage/stats", dependencies=[Depends(get_parent_user)])
+    def storage_stats():
+        # Queue depth and in-flight calls on the storage pool
+        return {**async_storage.stats(),
+                "image_cache": image_cache.stats()}
+
+    @app.get("/storage/reconcile", dependencies=[Depends(get_parent_user)])
+    def storage_reconcile():
+        # Orphans, missing objects and reclaimed bytes of the last check
+        return reconcile_report()
+
+    @app.get("/events/stats", dependencies=[Depends(get_parent_user)])
+    def events_stats():
+        # Open event streams and events dispatched by this worker
+        return event_bus.stats()
+
+    @app.get("/passwords/stats", dependencies=[Depends(get_parent_user)])
+    def passwords_stats():
+        # bcrypt pool load and hash/verify timings
+        return password_stats()
 
     # Plug in our routes
     app.include_router(
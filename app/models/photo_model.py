@@ -1,6 +1,10 @@
-from sqlalchemy import (Column, Integer, String,
-                        DateTime, ForeignKey, Text, func)
+from sqlalchemy import (Column, Integer, SmallInteger, BigInteger, String,
+                        Boolean,
+                        DateTime, ForeignKey, Text, Index, UniqueConstraint,
+                        DDL, event, func)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 from app.database.database import Base
 
 
@@ -12,7 +16,23 @@ class Photo(Base):
     # Changed: removed () so it calls the function on insert
     timestamp = Column(DateTime,
                        default=func.now())
+    # Capture time from EXIF, or the upload time when there is none
+    taken_at = Column(DateTime, nullable=True)
+    # month * 100 + day of `taken_at`, kept in sync below so
+    # "on this day" is an index lookup instead of an extract() scan
+    month_day = Column(SmallInteger, nullable=True)
+    # Read from the image header; NULL until parsed, 0 if unreadable
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # EXIF orientation tag (1-8), clients rotate the original with it
+    orientation = Column(SmallInteger, nullable=True)
+    camera = Column(String(100), nullable=True, index=True)
+    # 64-bit dHash (app/core/phash.py) stored signed; NULL until hashed
+    phash = Column(BigInteger, nullable=True)
     uploader_id = Column(Integer, ForeignKey("users.id"))
+    # Set by the derivative pipeline once every size has been stored
+    variants_ready = Column(Boolean, default=False,
+                            server_default="false", nullable=False)
 
     uploader = relationship("User", back_populates="photos")
     likes = relationship("Like",
@@ -24,12 +44,59 @@ class Photo(Base):
     views = relationship("View",
                          back_populates="photo",
                          cascade="all, delete-orphan")
+    stats = relationship("PhotoStats",
+                         uselist=False,
+                         cascade="all, delete-orphan")
     album_id = Column(Integer, ForeignKey("albums.id"), nullable=True)
-    album = relationship("Album", back_populates="photos")
+    album = relationship("Album",
+                         back_populates="photos",
+                         foreign_keys=[album_id])
+
+
+# Keyset pagination indexes for /feed: newest first, id as tie-breaker
+Index("ix_photos_feed_order",
+      Photo.timestamp.desc(), Photo.id.desc())
+Index("ix_photos_uploader_feed_order",
+      Photo.uploader_id, Photo.timestamp.desc(), Photo.id.desc())
+# Same, by capture time for /feed?sort=taken and "on this day"
+Index("ix_photos_taken_order",
+      Photo.taken_at.desc(), Photo.id.desc())
+Index("ix_photos_month_day",
+      Photo.month_day, Photo.taken_at.desc(), Photo.id.desc())
+# Direct uploads (see DIRECT_UPLOAD_PREFIX) have no StoredObject row,
+# so this is what stops a key from being committed twice
+Index("uq_photos_direct_key", Photo.minio_key, unique=True,
+      postgresql_where=Photo.minio_key.like("direct/%"),
+      sqlite_where=Photo.minio_key.like("direct/%"))
+
+
+def month_day_of(value) -> int:
+    return value.month * 100 + value.day
+
+
+@event.listens_for(Photo, "before_insert")
+def _default_taken_at(mapper, connection, target):
+    if target.taken_at is None:
+        # timestamp may still be the SQL now() default at this point
+        upload_time = target.timestamp if isinstance(
+            target.timestamp, datetime) else datetime.now(timezone.utc)
+        target.taken_at = upload_time
+
+
+@event.listens_for(Photo, "before_insert")
+@event.listens_for(Photo, "before_update")
+def _sync_month_day(mapper, connection, target):
+    if isinstance(target.taken_at, datetime):
+        target.month_day = month_day_of(target.taken_at)
 
 
 class Like(Base):
     __tablename__ = "photo_likes"
+    # Lets the like toggle be a single INSERT ... ON CONFLICT
+    __table_args__ = (
+        UniqueConstraint("photo_id", "user_id",
+                         name="uq_photo_likes_photo_user"),
+    )
     id = Column(Integer, primary_key=True)
     photo_id = Column(Integer, ForeignKey("photos.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -51,8 +118,19 @@ class Comment(Base):
     user = relationship("User")
 
 
+# Comment threads and the recent-comments window scan this per photo
+Index("ix_photo_comments_thread",
+      Comment.photo_id, Comment.timestamp, Comment.id)
+
+
 class View(Base):
     __tablename__ = "photo_views"
+    # One row per viewer, so buffered views can be bulk-inserted with
+    # ON CONFLICT DO NOTHING
+    __table_args__ = (
+        UniqueConstraint("photo_id", "user_id",
+                         name="uq_photo_views_photo_user"),
+    )
     id = Column(Integer, primary_key=True)
     photo_id = Column(Integer, ForeignKey("photos.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -62,6 +140,58 @@ class View(Base):
     user = relationship("User")
 
 
+class PhotoStats(Base):
+    """
+    Like/comment/view counters per photo, updated in the same
+    transaction as the row they count (see app/core/photo_stats.py).
+    A missing row means all zeros.
+    """
+    __tablename__ = "photo_stats"
+    photo_id = Column(Integer,
+                      ForeignKey("photos.id", ondelete="CASCADE"),
+                      primary_key=True)
+    likes = Column(Integer, default=0, server_default="0", nullable=False)
+    comments = Column(Integer, default=0, server_default="0",
+                      nullable=False)
+    views = Column(Integer, default=0, server_default="0", nullable=False)
+
+
+class PhotoSearch(Base):
+    """
+    Searchable text of a photo: its caption, album title and comments.
+    Rebuilt by app/core/search.py in the same transaction as the change.
+    On SQLite (tests) the ranked index is the FTS5 table created below.
+    """
+    __tablename__ = "photo_search"
+    photo_id = Column(Integer,
+                      ForeignKey("photos.id", ondelete="CASCADE"),
+                      primary_key=True)
+    # Plain text for the trigram fallback
+    document = Column(Text, nullable=False, default="")
+    # Caption weighted A, album title B, comments C
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"),
+                           nullable=True)
+
+
+Index("ix_photo_search_vector", PhotoSearch.search_vector,
+      postgresql_using="gin").ddl_if(dialect="postgresql")
+Index("ix_photo_search_document_trgm", PhotoSearch.document,
+      postgresql_using="gin",
+      postgresql_ops={"document": "gin_trgm_ops"}
+      ).ddl_if(dialect="postgresql")
+
+event.listen(PhotoSearch.__table__, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+             .execute_if(dialect="postgresql"))
+event.listen(PhotoSearch.__table__, "after_create",
+             DDL("CREATE VIRTUAL TABLE photo_search_fts "
+                 "USING fts5(caption, album, comments)")
+             .execute_if(dialect="sqlite"))
+event.listen(PhotoSearch.__table__, "after_drop",
+             DDL("DROP TABLE IF EXISTS photo_search_fts")
+             .execute_if(dialect="sqlite"))
+
+
 class Album(Base):
     __tablename__ = "albums"
     id = Column(Integer, primary_key=True)
@@ -69,7 +199,48 @@ class Album(Base):
     description = Column(String, nullable=True)
     created_at = Column(DateTime, default=func.now())
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Maintained by app/core/albums.py in the same transaction as the
+    # photo insert/delete/move, so listing albums never scans photos
+    photo_count = Column(Integer, default=0,
+                         server_default="0", nullable=False)
+    cover_photo_id = Column(Integer,
+                            ForeignKey("photos.id",
+                                       use_alter=True,
+                                       ondelete="SET NULL"),
+                            nullable=True)
 
     # Relationships
-    photos = relationship("Photo", back_populates="album")
+    photos = relationship("Photo",
+                          back_populates="album",
+                          foreign_keys="Photo.album_id")
+    cover_photo = relationship("Photo", foreign_keys=[cover_photo_id])
     owner = relationship("User")
+
+
+class StoredObject(Base):
+    """
+    Content-addressed object in the bucket. Photos and avatars with
+    identical bytes share one object; ref_count tracks how many rows
+    point at it so it is only removed with the last reference.
+    """
+    __tablename__ = "stored_objects"
+    key = Column(String, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=func.now())
+
+
+class PendingDeletion(Base):
+    """
+    Storage key waiting to be removed by the deletion worker (see
+    app/core/deletions.py). Queued in the transaction that deleted its
+    last reference, so nothing is lost across restarts.
+    """
+    __tablename__ = "pending_deletions"
+    key = Column(String, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0,
+                      server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False, default=func.now(),
+                             index=True)
+    created_at = Column(DateTime, default=func.now())
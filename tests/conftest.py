@@ -1,13 +1,18 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.database.database import Base
+from app.models import user_models, photo_model, utilities  # noqa
 
 
 @pytest.fixture(scope="function")
 def db_session():
     # Use an in-memory SQLite database for testing
-    engine = create_engine("sqlite:///:memory:")
+    # (shared across threads: async helpers hop onto the threadpool)
+    engine = create_engine("sqlite:///:memory:",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
     Base.metadata.create_all(bind=engine)
     TestingSessionLocal = sessionmaker(bind=engine)
 
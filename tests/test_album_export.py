@@ -0,0 +1,64 @@
+import io
+import zipfile
+from datetime import datetime
+
+from app.core import album_export
+from app.core.album_export import ZipEntry, album_entries, stream_zip
+from app.core.storage_backends import ObjectNotFound
+from app.models.photo_model import Album, Photo
+
+
+class FakeBackend:
+    objects = {"a.jpg": b"a" * 2500, "b.png": b"", "c.jpg": b"c" * 10}
+
+    def stream(self, key, chunk_size=1000):
+        if key not in self.objects:
+            raise ObjectNotFound(key)
+        data = self.objects[key]
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+
+def test_stream_zip_stores_entries_and_skips_missing(monkeypatch):
+    monkeypatch.setattr(album_export, "get_backend", FakeBackend)
+    entries = [ZipEntry("1.jpg", "a.jpg", datetime(2024, 5, 1, 12, 30)),
+               ZipEntry("2.jpg", "gone.jpg"),
+               ZipEntry("3.png", "b.png"),
+               ZipEntry("4.jpg", "c.jpg", datetime(1970, 1, 1))]
+
+    parts = list(stream_zip(entries, prefetch=1, read_ahead=1))
+    # Bytes are sent per chunk, not once the archive is complete
+    assert len([p for p in parts if p]) > 3
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(parts))) as archive:
+        assert archive.namelist() == ["1.jpg", "3.png", "4.jpg"]
+        assert archive.read("1.jpg") == b"a" * 2500
+        assert archive.read("3.png") == b""
+        info = archive.getinfo("1.jpg")
+        assert info.compress_type == zipfile.ZIP_STORED
+        assert info.date_time == (2024, 5, 1, 12, 30, 0)
+        assert archive.testzip() is None
+
+
+def test_album_entries_without_capture_time(db_session):
+    album = Album(title="Legacy")
+    db_session.add(album)
+    db_session.flush()
+    dated, undated, bare = [
+        Photo(minio_key=key, album_id=album.id,
+              taken_at=datetime(2024, 5, 1, 12, 30),
+              timestamp=datetime(2024, 6, 1, 8, 0))
+        for key in ("a.jpg", "b.png", "c")]
+    db_session.add_all([dated, undated, bare])
+    db_session.flush()
+    # Legacy rows from before capture times were backfilled
+    db_session.query(Photo).filter(Photo.id == undated.id).update(
+        {Photo.taken_at: None})
+    db_session.query(Photo).filter(Photo.id == bare.id).update(
+        {Photo.taken_at: None, Photo.timestamp: None})
+    db_session.commit()
+
+    assert [entry.name for entry in album_entries(db_session, album.id)] \
+        == [f"{bare.id}.c",
+            f"2024-05-01_123000_{dated.id}.jpg",
+            f"2024-06-01_080000_{undated.id}.png"]
@@ -0,0 +1,55 @@
+from app.core.albums import add_to_album, remove_from_album, move_photo
+from app.models.photo_model import Album, Photo
+from app.models.user_models import User
+
+
+def _album_with_photos(db, n):
+    user = User(username="alice")
+    album = Album(title="Holiday", owner=user)
+    db.add(album)
+    db.flush()
+    photos = []
+    for i in range(n):
+        photo = Photo(minio_key=f"{i}.jpg", album_id=album.id,
+                      uploader_id=user.id)
+        db.add(photo)
+        db.flush()
+        add_to_album(db, album.id, photo.id)
+        photos.append(photo)
+    db.commit()
+    return album, photos
+
+
+def test_counters_follow_uploads_and_deletes(db_session):
+    album, photos = _album_with_photos(db_session, 3)
+    db_session.refresh(album)
+    assert album.photo_count == 3
+    assert album.cover_photo_id == photos[0].id
+
+    # Deleting the cover promotes the oldest remaining photo
+    remove_from_album(db_session, album.id, [photos[0].id])
+    db_session.delete(photos[0])
+    db_session.commit()
+    db_session.refresh(album)
+    assert album.photo_count == 2
+    assert album.cover_photo_id == photos[1].id
+
+    remove_from_album(db_session, album.id, [p.id for p in photos[1:]])
+    db_session.commit()
+    db_session.refresh(album)
+    assert (album.photo_count, album.cover_photo_id) == (0, None)
+
+
+def test_move_photo_between_albums(db_session):
+    album, photos = _album_with_photos(db_session, 2)
+    other = Album(title="Garden")
+    db_session.add(other)
+    db_session.commit()
+
+    move_photo(db_session, photos[0], other.id)
+    db_session.commit()
+    db_session.refresh(album)
+    db_session.refresh(other)
+
+    assert (album.photo_count, album.cover_photo_id) == (1, photos[1].id)
+    assert (other.photo_count, other.cover_photo_id) == (1, photos[0].id)
@@ -0,0 +1,100 @@
+import io
+import asyncio
+import hashlib
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app.core.content_store import (hash_stream, store_content,
+                                    release_content)
+from app.core.deletions import enqueue_deletions
+from app.core.storage import async_storage
+from app.models.photo_model import Photo, StoredObject, PendingDeletion
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """Records storage writes instead of talking to MinIO."""
+    written = []
+
+    async def fake_put(key, stream, size=-1, content_type=None):
+        written.append(key)
+
+    monkeypatch.setattr(async_storage, "put_object", fake_put)
+    return written
+
+
+def _store(db, data, ext="jpg"):
+    return asyncio.run(store_content(db, io.BytesIO(data), ext))
+
+
+def test_hash_stream_rewinds():
+    data = b"x" * (3 * 1024 + 17)
+    stream = io.BytesIO(data)
+    digest, size = hash_stream(stream, chunk_size=1024)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert size == len(data)
+    assert stream.tell() == 0
+
+
+def test_duplicate_upload_reuses_object(db_session, uploads):
+    key_a, new_a = _store(db_session, b"same")
+    key_b, new_b = _store(db_session, b"same", "JPG")
+    db_session.commit()
+
+    assert new_a and not new_b
+    assert key_a == key_b
+    assert uploads == [key_a]
+    assert db_session.get(StoredObject, key_a).ref_count == 2
+
+
+def test_object_released_with_last_reference(db_session, uploads):
+    key, _ = _store(db_session, b"pic")
+    _store(db_session, b"pic")
+    db_session.commit()
+
+    assert release_content(db_session, key) is False
+    assert release_content(db_session, key) is True
+    db_session.commit()
+    assert db_session.get(StoredObject, key) is None
+
+    # Legacy uuid keys have no row and are single-reference
+    assert release_content(db_session, "legacy.jpg") is True
+
+
+def test_concurrent_uploads_share_session(db_session, uploads):
+    """Same bytes twice in one batch end up as one object, two refs."""
+    async def batch():
+        lock = asyncio.Lock()
+        return await asyncio.gather(*(
+            store_content(db_session, io.BytesIO(data), "jpg", db_lock=lock)
+            for data in (b"burst", b"burst", b"other")))
+
+    results = asyncio.run(batch())
+    db_session.commit()
+
+    assert results[0][0] == results[1][0]
+    assert db_session.get(StoredObject, results[0][0]).ref_count == 2
+    assert db_session.query(StoredObject).count() == 2
+
+
+def test_reupload_cancels_queued_deletion(db_session, uploads):
+    key, _ = _store(db_session, b"back again")
+    release_content(db_session, key)
+    enqueue_deletions(db_session, [key])
+    db_session.commit()
+
+    assert _store(db_session, b"back again") == (key, True)
+    db_session.commit()
+    assert db_session.query(PendingDeletion).count() == 0
+
+
+def test_direct_upload_key_is_committed_once(db_session):
+    # Content-addressed keys are shared, direct upload keys are not
+    db_session.add_all([Photo(minio_key="objects/abc.jpg"),
+                        Photo(minio_key="objects/abc.jpg"),
+                        Photo(minio_key="direct/1/abc.jpg")])
+    db_session.commit()
+
+    db_session.add(Photo(minio_key="direct/1/abc.jpg"))
+    with pytest.raises(IntegrityError):
+        db_session.commit()
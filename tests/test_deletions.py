@@ -0,0 +1,67 @@
+from app.core import deletions
+from app.core.albums import add_to_album
+from app.core.deletions import delete_photos, drain_deletions
+from app.core.photo_stats import bump_stats
+from app.models.photo_model import (Album, Photo, Comment, Like,
+                                    StoredObject, PendingDeletion)
+from app.models.user_models import User
+
+
+def _seed(db):
+    """Three photos in an album; the first two share one object."""
+    user = User(username="alice")
+    album = Album(title="Blurry", owner=user)
+    db.add(album)
+    db.flush()
+    db.add(StoredObject(key="objects/a.jpg", sha256="a", size=1,
+                        ref_count=2))
+    photos = []
+    for key in ("objects/a.jpg", "objects/a.jpg", "legacy.jpg"):
+        photo = Photo(minio_key=key, album_id=album.id, uploader_id=user.id)
+        db.add(photo)
+        db.flush()
+        add_to_album(db, album.id, photo.id)
+        db.add(Like(photo_id=photo.id, user_id=user.id))
+        db.add(Comment(photo_id=photo.id, user_id=user.id, text="hi"))
+        bump_stats(db, {photo.id: {"likes": 1, "comments": 1}})
+        photos.append(photo)
+    db.commit()
+    return album, photos
+
+
+def test_delete_photos_queues_only_unreferenced_objects(db_session):
+    album, photos = _seed(db_session)
+
+    keys = delete_photos(db_session, [photos[0], photos[2]])
+    db_session.commit()
+
+    # The shared object still has one photo pointing at it
+    assert "objects/a.jpg" not in keys
+    assert "legacy.jpg" in keys and "legacy_thumb.webp" in keys
+    assert {row.key for row in db_session.query(PendingDeletion)} == \
+        set(keys)
+    assert db_session.query(Photo).count() == 1
+    assert db_session.query(Like).count() == 1
+    assert db_session.query(Comment).count() == 1
+    db_session.refresh(album)
+    assert (album.photo_count, album.cover_photo_id) == (1, photos[1].id)
+
+
+def test_drain_retries_failed_keys(db_session, monkeypatch):
+    deletions.enqueue_deletions(db_session, ["ok.jpg", "stuck.jpg"])
+    db_session.commit()
+    removed = []
+
+    class FlakyBackend:
+        def delete_many(self, keys):
+            removed.extend(k for k in keys if k != "stuck.jpg")
+            return ["stuck.jpg"]
+
+    monkeypatch.setattr(deletions, "get_backend", FlakyBackend)
+    assert drain_deletions(db_session) == 1
+    assert removed == ["ok.jpg"]
+
+    stuck = db_session.query(PendingDeletion).one()
+    assert (stuck.key, stuck.attempts) == ("stuck.jpg", 1)
+    # Backed off, so an immediate second drain leaves it alone
+    assert drain_deletions(db_session) == 0
@@ -0,0 +1,49 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from app.core import derivatives
+from app.core.derivatives import (render_derivatives, derivative_key,
+                                  photo_urls, DERIVATIVE_SIZES)
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_derivative_key_sits_next_to_original():
+    assert derivative_key("abc.jpg", "thumb") == "abc_thumb.webp"
+    assert derivative_key("abc", "feed") == "abc_feed.webp"
+
+
+def test_render_derivatives_sizes():
+    """Verify each size fits its bound and small images are not upscaled."""
+    rendered = render_derivatives(_jpeg(4000, 3000))
+    assert set(rendered) == set(DERIVATIVE_SIZES)
+
+    with Image.open(io.BytesIO(rendered["thumb"])) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (320, 240)
+
+    small = render_derivatives(_jpeg(200, 100), image_format="jpeg")
+    with Image.open(io.BytesIO(small["full"])) as full:
+        assert full.size == (200, 100)
+
+
+def test_photo_urls_fall_back_to_original():
+    pending = photo_urls("abc.jpg", variants_ready=False)
+    assert all(url.endswith("/abc.jpg") for url in pending.values())
+
+    ready = photo_urls("abc.jpg", variants_ready=True)
+    assert ready["thumb"].endswith("/abc_thumb.webp")
+
+
+def test_pool_is_created_once_under_concurrency():
+    with ThreadPoolExecutor(max_workers=8) as threads:
+        pools = set(threads.map(lambda _: derivatives._get_pool(),
+                                range(32)))
+    try:
+        assert len(pools) == 1
+    finally:
+        derivatives.shutdown_derivative_pool()
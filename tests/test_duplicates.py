@@ -0,0 +1,113 @@
+import io
+import random
+
+from PIL import Image, ImageDraw
+
+from app.core import duplicates
+from app.core import response_cache
+from app.core.duplicates import (backfill_phash, duplicate_groups,
+                                 find_duplicate_groups)
+from app.core.phash import (dhash, hamming, near_pairs, to_signed,
+                            from_signed)
+from app.models.photo_model import Photo
+from app.models.user_models import User
+
+
+def _image(seed, size=(640, 480), quality=90):
+    """The same random drawing for a seed, saved at any size/quality."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (640, 480), "white")
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(640), rng.randrange(480)
+        draw.ellipse((x, y, x + 150, y + 120), fill=tuple(
+            rng.randrange(256) for _ in range(3)))
+    img = img.resize(size)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_dhash_survives_recompression_and_resizing():
+    original = dhash(_image(1))
+    copy = dhash(_image(1, size=(320, 240), quality=40))
+    other = dhash(_image(2))
+
+    assert hamming(original, copy) <= 6
+    assert hamming(original, other) > 16
+    assert from_signed(to_signed(original)) == original
+    assert -2 ** 63 <= to_signed(2 ** 64 - 1) < 2 ** 63
+
+
+def test_near_pairs_matches_brute_force():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    # Near copies of the first 100, a few bits flipped each
+    values += [value ^ (1 << rng.randrange(64)) ^ 0b1011
+               for value in values[:100]]
+
+    found = list(near_pairs(values, 10))
+    assert len(found) == len(set(found)) >= 100
+    assert set(found) == {
+        (i, j) for i in range(len(values))
+        for j in range(i + 1, len(values))
+        if hamming(values[i], values[j]) <= 10}
+
+
+def test_groups_and_backfill(db_session, monkeypatch):
+    objects = {"a.jpg": _image(1), "a-small.jpg": _image(1, (320, 240), 40),
+               "b.jpg": _image(2), "broken.jpg": b"not an image"}
+
+    class FakeBackend:
+        def get(self, key):
+            return objects[key]
+
+    monkeypatch.setattr(duplicates, "get_backend", FakeBackend)
+    user = User(username="alice")
+    db_session.add(user)
+    db_session.flush()
+    photos = [Photo(minio_key=key, uploader_id=user.id)
+              for key in ("a.jpg", "a-small.jpg", "b.jpg", "broken.jpg",
+                          "a.jpg")]
+    db_session.add_all(photos)
+    db_session.commit()
+
+    # Shared objects are hashed once, unreadable ones are skipped
+    assert backfill_phash(db_session, workers=2, batch_size=2) == 3
+    assert photos[3].phash is None
+
+    groups = find_duplicate_groups(db_session)
+    assert groups == [[photos[4].id, photos[1].id, photos[0].id]]
+
+
+def _flat(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_flat_images_are_not_duplicates(db_session):
+    assert dhash(_flat("red")) == dhash(_flat("blue")) == 0
+    db_session.add_all([Photo(minio_key=f"{color}.png",
+                              phash=to_signed(dhash(_flat(color))))
+                        for color in ("red", "blue")])
+    db_session.commit()
+
+    assert find_duplicate_groups(db_session) == []
+
+
+def test_groups_are_cached_until_invalidated(db_session):
+    response_cache.invalidate(response_cache.DUPLICATES)
+    value = to_signed(dhash(_image(1)))
+    db_session.add_all([Photo(minio_key=key, phash=value)
+                        for key in ("a.jpg", "b.jpg")])
+    db_session.commit()
+    assert len(duplicate_groups(db_session)[0]) == 2
+
+    db_session.add(Photo(minio_key="c.jpg", phash=value))
+    db_session.commit()
+    # Likes and comments do not touch the DUPLICATES scope
+    response_cache.invalidate(response_cache.PHOTOS)
+    assert len(duplicate_groups(db_session)[0]) == 2
+    response_cache.invalidate(response_cache.DUPLICATES)
+    assert len(duplicate_groups(db_session)[0]) == 3
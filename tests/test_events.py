@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from app.core.events import EventBus, event_bus, publish, RESYNC
+from app.models.user_models import User
+
+
+def test_events_are_sent_on_commit_only(db_session):
+    async def scenario():
+        subscription = event_bus.subscribe()
+        _, queue = subscription
+        try:
+            db_session.add(User(username="alice"))
+            publish(db_session, "like", photo_id=1, liked=True)
+            await asyncio.sleep(0)
+            assert queue.empty()
+            db_session.commit()
+
+            publish(db_session, "comment", comment_id=1, photo_id=1)
+            db_session.rollback()
+            db_session.commit()
+            await asyncio.sleep(0)
+            return [json.loads(queue.get_nowait())
+                    for _ in range(queue.qsize())]
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    assert asyncio.run(scenario()) == [
+        {"type": "like", "photo_id": 1, "liked": True}]
+
+
+def test_slow_subscriber_is_told_to_resync():
+    bus = EventBus(queue_size=2)
+
+    async def scenario():
+        _, queue = bus.subscribe()
+        for i in range(3):
+            bus.dispatch(json.dumps({"type": "like", "photo_id": i}))
+        await asyncio.sleep(0)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert asyncio.run(scenario()) == [RESYNC]
+    assert bus.stats()["dispatched"] == 3
+
+
+def test_oversized_event_becomes_resync(db_session):
+    async def scenario():
+        subscription = event_bus.subscribe()
+        _, queue = subscription
+        try:
+            publish(db_session, "photos_deleted",
+                    photo_ids=list(range(100000, 102000)))
+            db_session.commit()
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    assert asyncio.run(scenario()) == [RESYNC]
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+import pytest
+from app.core import image_cache as image_cache_module
+from app.core.image_cache import DiskLRUCache, file_headers
+from app.core.storage_backends import ObjectStat
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """A fake backend holding a few objects, counting downloads."""
+    objects = {"a.jpg": b"a" * 40, "b.jpg": b"b" * 40, "c.jpg": b"c" * 40,
+               "huge.jpg": b"h" * 500}
+    downloads = []
+    modified = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    class FakeBackend:
+        def stat(self, key):
+            return ObjectStat(len(objects[key]), modified)
+
+        def download(self, key, path):
+            downloads.append(key)
+            with open(path, "wb") as f:
+                f.write(objects[key])
+
+    monkeypatch.setattr(image_cache_module, "get_backend", FakeBackend)
+    return downloads
+
+
+def test_fetch_caches_and_evicts_least_recent(tmp_path, bucket):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    path = cache.fetch("a.jpg")
+    assert cache.fetch("a.jpg") == path
+    assert bucket == ["a.jpg"]
+
+    cache.fetch("b.jpg")
+    cache.get("a.jpg")
+    cache.fetch("c.jpg")
+    assert cache.get("b.jpg") is None
+    assert cache.get("a.jpg") is not None
+    assert cache.stats()["bytes"] == 80
+
+    # Larger than the whole cache: left to MinIO
+    assert cache.fetch("huge.jpg") is None
+
+
+def test_discard_and_reload_from_disk(tmp_path, bucket):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    path = cache.fetch("a.jpg")
+    cache.fetch("b.jpg")
+    media_type, headers = file_headers("a.jpg", path)
+    assert media_type == "image/jpeg"
+
+    cache.discard("b.jpg")
+    restarted = DiskLRUCache(str(tmp_path), max_bytes=100)
+    assert restarted.get("b.jpg") is None
+    assert restarted.get("a.jpg") == path
+    # Same ETag after a restart, mtime follows the object
+    assert file_headers("a.jpg", path)[1]["ETag"] == headers["ETag"]
+
+
+def test_pinned_files_outlive_eviction(tmp_path, bucket):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    path = cache.fetch("a.jpg", pin=True)
+    cache.fetch("b.jpg")
+    cache.fetch("c.jpg")
+    # a.jpg is the oldest but still being served, b.jpg goes instead
+    assert cache.get("b.jpg") is None
+    assert os.path.exists(path)
+
+    # Over the limit while pinned, caught up on release
+    cache.max_bytes = 60
+    cache.fetch("b.jpg")
+    assert os.path.exists(path)
+    cache.release(path)
+    assert not os.path.exists(path)
+    assert cache.stats()["bytes"] == 40
+
+
+def test_concurrent_misses_share_one_download(tmp_path, bucket,
+                                              monkeypatch):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000)
+    cache.get("a.jpg")
+    started = threading.Event()
+    download = image_cache_module.get_backend().download
+
+    def slow_download(key, path):
+        started.set()
+        time.sleep(0.1)
+        download(key, path)
+
+    monkeypatch.setattr(image_cache_module.get_backend().__class__,
+                        "download", lambda self, k, p: slow_download(k, p))
+    first = threading.Thread(target=cache.fetch, args=("a.jpg",))
+    first.start()
+    started.wait()
+    # One waiter finishing must not hand the next caller a new lock
+    waiters = [threading.Thread(target=cache.fetch, args=("a.jpg",))
+               for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    for thread in [first] + waiters:
+        thread.join()
+
+    assert bucket == ["a.jpg"]
+    assert cache.stats() == {"objects": 1, "bytes": 40, "max_bytes": 1000}
+    assert not [name for name in os.listdir(tmp_path)
+                if name.endswith(".part")]
@@ -0,0 +1,49 @@
+import pytest
+
+from app.core.ledger import (apply_to_balance, set_balance, pay_out,
+                             InsufficientFunds)
+from app.models.user_models import Child, Transaction
+
+
+def _child(db, balance=10.0, name="Sam"):
+    child = Child(name=name, balance=balance)
+    db.add(child)
+    db.commit()
+    return child.id
+
+
+def test_withdrawals_never_overdraw(db_session):
+    child_id = _child(db_session)
+
+    name, balance, txn = apply_to_balance(db_session, child_id, -7.5,
+                                          "Lego", "Spend",
+                                          require_funds=True)
+    db_session.commit()
+    assert (name, balance, txn.amount) == ("Sam", 2.5, -7.5)
+
+    # The second one fails the check inside the UPDATE
+    with pytest.raises(InsufficientFunds) as err:
+        apply_to_balance(db_session, child_id, -7.5, "Lego", "Spend",
+                         require_funds=True)
+    assert err.value.balance == 2.5
+    with pytest.raises(LookupError):
+        apply_to_balance(db_session, 999, 1.0, "Gift", "Deposit")
+    db_session.rollback()
+
+    assert db_session.get(Child, child_id).balance == 2.5
+    assert db_session.query(Transaction).count() == 1
+
+
+def test_set_balance_and_weekly_payout(db_session):
+    sam, alex = _child(db_session), _child(db_session, 0.0, "Alex")
+
+    assert set_balance(db_session, sam, 4.0, "Manual Balance Adjustment",
+                       "Correction") == 4.0
+    pay_out(db_session, {sam: (5.0, "Weekly"), alex: (5.5, "Weekly")})
+    db_session.commit()
+
+    db_session.expire_all()
+    assert db_session.get(Child, sam).balance == 9.0
+    assert db_session.get(Child, alex).balance == 5.5
+    assert sorted(t.amount for t in db_session.query(Transaction)) == \
+        [-6.0, 5.0, 5.5]
@@ -0,0 +1,21 @@
+from sqlalchemy import create_engine, inspect
+
+from app.database import migrate as migrate_module
+from app.database.migrate import migrate
+
+
+def test_fresh_database_is_created_and_stamped(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrate_module.command, "stamp",
+                        lambda config, rev: calls.append(("stamp", rev)))
+    monkeypatch.setattr(migrate_module.command, "upgrade",
+                        lambda config, rev: calls.append(("upgrade", rev)))
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+
+    migrate(engine)
+    assert "photo_search" in inspect(engine).get_table_names()
+    assert calls == [("stamp", "head")]
+
+    # Existing databases go through the migration chain instead
+    migrate(engine)
+    assert calls[-1] == ("upgrade", "head")
@@ -0,0 +1,45 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from app.core import passwords
+from app.core.passwords import (hash_password, verify_password,
+                                password_stats, PasswordPoolBusy)
+
+
+def test_hash_and_verify_on_the_pool():
+    async def round_trip():
+        hashed = await hash_password("secret")
+        return (await verify_password("secret", hashed),
+                await verify_password("wrong", hashed))
+
+    assert asyncio.run(round_trip()) == (True, False)
+    stats = password_stats()
+    assert stats["pending"] == 0
+    assert stats["timings"]["hash"]["count"] >= 1
+    passwords.shutdown_password_pool()
+
+
+def test_saturated_pool_refuses_work(monkeypatch):
+    monkeypatch.setattr(passwords, "_pending",
+                        passwords.PASSWORD_WORKERS
+                        + passwords.PASSWORD_QUEUE_MAX)
+    with pytest.raises(PasswordPoolBusy):
+        asyncio.run(hash_password("secret"))
+
+
+def test_broken_pool_is_replaced(monkeypatch):
+    class BrokenPool:
+        def submit(self, *args):
+            raise BrokenProcessPool("A worker died")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    monkeypatch.setattr(passwords, "_pool", BrokenPool())
+    try:
+        hashed = passwords.pwd_context.hash("secret")
+        assert asyncio.run(verify_password("secret", hashed))
+        assert isinstance(passwords._pool, ProcessPoolExecutor)
+    finally:
+        passwords.shutdown_password_pool()
@@ -0,0 +1,151 @@
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.api.v1.family_photos import format_photo_list, _photo_query
+from app.core.photo_feed import (fetch_recent_comments,
+                                 comment_thread_page,
+                                 encode_feed_cursor,
+                                 decode_feed_cursor,
+                                 paginate_by_keyset,
+                                 on_this_day_page,
+                                 invalidate_on_this_day)
+from app.core.photo_stats import bump_stats
+from app.models.photo_model import Photo, Like, Comment, View
+from app.models.user_models import User
+
+
+def _seed(db, n_photos=5):
+    """Creates two users and n photos, each with likes/views/comments."""
+    alice = User(username="alice", display_name="Alice")
+    bob = User(username="bob")
+    db.add_all([alice, bob])
+    db.flush()
+
+    start = datetime(2026, 1, 1, 12, 0)
+    for i in range(n_photos):
+        photo = Photo(minio_key=f"{i}.jpg",
+                      caption=f"photo {i}",
+                      uploader_id=alice.id,
+                      timestamp=start + timedelta(hours=i))
+        db.add(photo)
+        db.flush()
+        db.add(Like(photo_id=photo.id, user_id=bob.id))
+        db.add(View(photo_id=photo.id, user_id=alice.id))
+        db.add(View(photo_id=photo.id, user_id=bob.id))
+        for c in range(i):
+            db.add(Comment(photo_id=photo.id,
+                           user_id=bob.id,
+                           text=f"comment {c}",
+                           timestamp=start + timedelta(minutes=c)))
+        bump_stats(db, {photo.id: {"likes": 1, "views": 2, "comments": i}})
+    db.commit()
+    return alice, bob
+
+
+def test_recent_comments_preview(db_session):
+    """Verify the three-comment preview per photo."""
+    _seed(db_session)
+    ids = [p.id for p in db_session.query(Photo).order_by(Photo.id)]
+
+    # Only the last three comments, oldest of those first
+    recent = fetch_recent_comments(db_session, ids)
+    assert ids[0] not in recent
+    assert [c["text"] for c in recent[ids[4]]] == [
+        "comment 1", "comment 2", "comment 3"]
+    assert recent[ids[4]][0]["username"] == "bob"
+
+
+def test_feed_query_count_is_fixed(db_session):
+    """The number of queries must not grow with the page size."""
+    _seed(db_session, n_photos=12)
+    statements = []
+
+    def _count(*args):
+        statements.append(args)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        photos = _photo_query(db_session).order_by(
+            Photo.timestamp.desc()).all()
+        data = format_photo_list(photos, db_session)
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    assert len(data) == 12
+    assert data[0]["uploader"]["display_name"] == "Alice"
+    assert data[0]["stats"] == {"likes": 1, "comments": 11, "views": 2}
+    assert len(statements) == 2
+
+
+def test_feed_cursor_round_trip():
+    """Verify cursors decode to what was encoded and reject garbage."""
+    ts = datetime(2026, 3, 4, 5, 6, 7, 890)
+    assert decode_feed_cursor(encode_feed_cursor(ts, 42)) == (ts, 42)
+
+    with pytest.raises(ValueError):
+        decode_feed_cursor("not-a-cursor")
+
+
+def test_keyset_pages_cover_feed_without_repeats(db_session):
+    """Walk the feed page by page, uploading a photo mid-scroll."""
+    alice, _ = _seed(db_session, n_photos=7)
+    seen = []
+    cursor = None
+    while True:
+        photos, cursor = paginate_by_keyset(
+            db_session.query(Photo), limit=3, cursor=cursor)
+        seen.extend(p.id for p in photos)
+        if len(seen) == 3:
+            db_session.add(Photo(minio_key="new.jpg",
+                                 uploader_id=alice.id,
+                                 timestamp=datetime(2027, 1, 1)))
+            db_session.commit()
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+
+def test_comment_thread_pages_oldest_first(db_session):
+    _seed(db_session, n_photos=6)
+    photo_id = db_session.query(Photo.id).filter(
+        Photo.minio_key == "5.jpg").scalar()
+
+    texts, cursor = [], None
+    while True:
+        comments, cursor = comment_thread_page(db_session, photo_id,
+                                               limit=2, cursor=cursor)
+        texts.extend(c.text for c in comments)
+        if cursor is None:
+            break
+
+    assert texts == [f"comment {c}" for c in range(5)]
+    assert comments[0].user.username == "bob"
+
+
+def test_on_this_day_uses_month_day_and_caches(db_session):
+    """Only earlier years match, and the page is cached for the day."""
+    alice, _ = _seed(db_session, n_photos=0)
+    for ts in (datetime(2024, 10, 18, 9), datetime(2025, 10, 18, 9),
+               datetime(2025, 10, 19, 9), datetime(2026, 10, 18, 8)):
+        db_session.add(Photo(minio_key="k.jpg", uploader_id=alice.id,
+                             timestamp=ts))
+    db_session.commit()
+    assert {p.month_day for p in db_session.query(Photo)} == {1018, 1019}
+
+    invalidate_on_this_day()
+    today = date(2026, 10, 18)
+    ids, next_cursor = on_this_day_page(db_session, today, limit=10)
+    years = [db_session.get(Photo, i).timestamp.year for i in ids]
+    assert years == [2025, 2024]
+    assert next_cursor is None
+
+    # A second call is served from the cache without touching the DB
+    statements = []
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute",
+                 lambda *args: statements.append(args))
+    assert on_this_day_page(db_session, today, limit=10) == (ids, None)
+    assert statements == []
@@ -0,0 +1,69 @@
+import io
+from datetime import datetime
+from PIL import Image
+from app.core import photo_metadata
+from app.core.photo_metadata import (parse_metadata, read_metadata,
+                                     backfill_photo_metadata)
+from app.core.photo_feed import paginate_by_keyset
+from app.models.photo_model import Photo
+from app.models.user_models import User
+
+
+def _jpeg_with_exif(width=640, height=480):
+    exif = Image.Exif()
+    exif[271] = "Canon"
+    exif[272] = "Canon EOS R6"
+    exif[274] = 6
+    exif.get_ifd(0x8769)[36867] = "2009:07:14 18:30:05"
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "blue").save(
+        buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def test_parse_metadata_reads_header_only():
+    data = _jpeg_with_exif()
+    # Truncated well before the end of the pixel data
+    metadata = parse_metadata(data[:2048])
+    assert metadata == {"width": 640, "height": 480, "orientation": 6,
+                        "camera": "Canon EOS R6",
+                        "taken_at": datetime(2009, 7, 14, 18, 30, 5)}
+    assert parse_metadata(b"not an image") == {}
+
+
+def test_read_metadata_rewinds_the_upload():
+    stream = io.BytesIO(_jpeg_with_exif())
+    assert read_metadata(stream)["width"] == 640
+    assert stream.tell() == 0
+
+
+def test_backfill_and_capture_time_sort(db_session, monkeypatch):
+    heads = {"old.jpg": _jpeg_with_exif(), "bad.jpg": b"junk"}
+    monkeypatch.setattr(photo_metadata, "read_object_head",
+                        lambda key, length: heads[key][:length])
+
+    user = User(username="alice")
+    db_session.add(user)
+    db_session.flush()
+    for key in ("old.jpg", "bad.jpg"):
+        db_session.add(Photo(minio_key=key, uploader_id=user.id,
+                             timestamp=datetime(2026, 1, 1)))
+    db_session.add(Photo(minio_key="new.jpg", uploader_id=user.id,
+                         timestamp=datetime(2025, 1, 1),
+                         taken_at=datetime(2025, 1, 1), width=10))
+    db_session.commit()
+
+    assert backfill_photo_metadata(db_session) == 2
+    old = db_session.query(Photo).filter_by(minio_key="old.jpg").one()
+    assert old.taken_at == datetime(2009, 7, 14, 18, 30, 5)
+    assert old.month_day == 714
+    bad = db_session.query(Photo).filter_by(minio_key="bad.jpg").one()
+    assert bad.width == 0 and bad.taken_at == datetime(2026, 1, 1)
+
+    # Nothing left to read on the next run
+    assert backfill_photo_metadata(db_session) == 0
+
+    photos, _ = paginate_by_keyset(db_session.query(Photo), limit=3,
+                                   order_by=Photo.taken_at)
+    assert [p.minio_key for p in photos] == ["bad.jpg", "new.jpg",
+                                             "old.jpg"]
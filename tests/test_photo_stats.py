@@ -0,0 +1,37 @@
+from app.core.photo_stats import bump_stats, toggle_like
+from app.models.photo_model import Photo, PhotoStats, Like
+from app.models.user_models import User
+
+
+def _photo(db):
+    user = User(username="alice")
+    db.add(user)
+    db.flush()
+    photo = Photo(minio_key="a.jpg", uploader_id=user.id)
+    db.add(photo)
+    db.commit()
+    return photo, user
+
+
+def test_bump_stats_upserts(db_session):
+    photo, _ = _photo(db_session)
+    bump_stats(db_session, {photo.id: {"views": 3}})
+    bump_stats(db_session, {photo.id: {"views": 1, "comments": 2}})
+    db_session.commit()
+
+    stats = db_session.get(PhotoStats, photo.id)
+    assert (stats.likes, stats.comments, stats.views) == (0, 2, 4)
+
+
+def test_toggle_like_keeps_counter_in_step(db_session):
+    photo, user = _photo(db_session)
+
+    assert toggle_like(db_session, photo.id, user.id) is True
+    db_session.commit()
+    assert db_session.get(PhotoStats, photo.id).likes == 1
+
+    assert toggle_like(db_session, photo.id, user.id) is False
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(PhotoStats, photo.id).likes == 0
+    assert db_session.query(Like).count() == 0
@@ -0,0 +1,75 @@
+import io
+import os
+import time
+
+from app.core import reconcile
+from app.core.reconcile import reconcile_storage
+from app.core.storage_backends import LocalBackend
+from app.models.photo_model import (Album, Photo, StoredObject,
+                                    PendingDeletion)
+from app.models.user_models import User
+
+
+def _put(backend, key, data=b"x", age_hours=48):
+    backend.put(key, io.BytesIO(data))
+    mtime = time.time() - age_hours * 3600
+    os.utime(backend._path(key), (mtime, mtime))
+
+
+def test_reconcile_queues_old_orphans_and_reports_missing(
+        db_session, tmp_path, monkeypatch):
+    backend = LocalBackend(str(tmp_path))
+    monkeypatch.setattr(reconcile, "get_backend", lambda: backend)
+
+    user = User(username="alice", profile_photo_key="objects/avatar.jpg")
+    album = Album(title="Summer", owner=user)
+    db_session.add(album)
+    db_session.flush()
+    for key in ("objects/kept.jpg", "objects/gone.jpg"):
+        db_session.add(Photo(minio_key=key, album_id=album.id,
+                             uploader_id=user.id))
+    db_session.add(StoredObject(key="objects/old.jpg", sha256="old",
+                                size=3, ref_count=1))
+    db_session.commit()
+
+    _put(backend, "objects/kept.jpg")
+    _put(backend, "objects/kept_thumb.webp")
+    _put(backend, "objects/avatar.jpg")
+    _put(backend, "objects/old.jpg", b"old")
+    _put(backend, "objects/old_thumb.webp", b"th")
+    # Still inside the grace period, e.g. an upload not committed yet
+    _put(backend, "objects/new.jpg", age_hours=1)
+
+    report = reconcile_storage(db_session, delete=True, grace_hours=24,
+                               batch_size=2)
+
+    assert report["objects"] == 6
+    assert sorted(report["orphan_keys"]) == ["objects/old.jpg",
+                                             "objects/old_thumb.webp"]
+    assert report["orphan_bytes"] == report["reclaimed_bytes"] == 5
+    assert report["missing"] == 1
+    assert report["missing_photo_ids"] == [
+        p.id for p in db_session.query(Photo).filter(
+            Photo.minio_key == "objects/gone.jpg")]
+    # Orphans go through the deletion queue and lose their content row
+    assert {row.key for row in db_session.query(PendingDeletion)} == \
+        {"objects/old.jpg", "objects/old_thumb.webp"}
+    assert db_session.query(StoredObject).count() == 0
+
+    # Queued keys are not counted again before the drain removes them
+    again = reconcile_storage(db_session, delete=False, grace_hours=24)
+    assert again["orphans"] == 0
+    assert reconcile.reconcile_report()["last_run"] == again
+
+
+def test_reconcile_only_reports_by_default(db_session, tmp_path,
+                                           monkeypatch):
+    backend = LocalBackend(str(tmp_path))
+    monkeypatch.setattr(reconcile, "get_backend", lambda: backend)
+    _put(backend, "objects/old.jpg", b"old")
+
+    report = reconcile_storage(db_session)
+
+    assert report["orphan_keys"] == ["objects/old.jpg"]
+    assert report["reclaimed_bytes"] == 0
+    assert db_session.query(PendingDeletion).count() == 0
@@ -0,0 +1,48 @@
+from starlette.requests import Request
+from app.core import response_cache
+from app.core.response_cache import LRUBackend
+
+
+def _request(path="/feed", query=b"", etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": path,
+                    "query_string": query, "headers": headers})
+
+
+def test_lru_backend_evicts_and_expires():
+    cache = LRUBackend(max_entries=2)
+    cache.set("a", b"1", ttl=60)
+    cache.set("b", b"2", ttl=60)
+    cache.get("a")
+    cache.set("c", b"3", ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+
+    cache.set("old", b"4", ttl=-1)
+    assert cache.get("old") is None
+
+
+def test_cache_key_ignores_query_order_and_follows_generation():
+    first = response_cache.cache_key("photos", _request(query=b"a=1&b=2"))
+    assert first == response_cache.cache_key(
+        "photos", _request(query=b"b=2&a=1"))
+
+    response_cache.invalidate("photos")
+    assert first != response_cache.cache_key(
+        "photos", _request(query=b"a=1&b=2"))
+
+
+def test_cached_response_honours_if_none_match():
+    key = response_cache.cache_key("photos", _request(path="/etag"))
+    assert response_cache.cached(key, _request()) is None
+
+    stored = response_cache.store(key, _request(), {"photos": [1, 2]})
+    etag = stored.headers["etag"]
+    assert stored.status_code == 200
+
+    hit = response_cache.cached(key, _request())
+    assert hit.body == stored.body
+
+    not_modified = response_cache.cached(key, _request(etag=etag))
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
@@ -0,0 +1,57 @@
+from app.core.deletions import delete_photos
+from app.core.search import refresh_search, search_photos
+from app.models.photo_model import Album, Photo, Comment
+from app.models.user_models import User
+
+
+def _seed(db):
+    user = User(username="alice")
+    album = Album(title="Beach holiday", owner=user)
+    db.add(album)
+    db.flush()
+    photos = [Photo(minio_key=f"{i}.jpg", caption=caption,
+                    uploader_id=user.id, album_id=album_id)
+              for i, (caption, album_id) in enumerate([
+                  ("Birthday cake", None),
+                  ("Grandma at the beach", None),
+                  ("Sunset", album.id),
+                  ("Car wash", None)])]
+    db.add_all(photos)
+    db.flush()
+    db.add(Comment(photo_id=photos[3].id, user_id=user.id,
+                   text="what a birthday that was"))
+    refresh_search(db, [p.id for p in photos])
+    db.commit()
+    return photos
+
+
+def test_search_ranks_captions_albums_and_comments(db_session):
+    cake, grandma, sunset, car = _seed(db_session)
+
+    # A caption match outranks the same word in a comment
+    ids, _ = search_photos(db_session, "birthday", limit=10)
+    assert ids == [cake.id, car.id]
+    # Album titles count, the last word matches as a prefix
+    ids, _ = search_photos(db_session, "beach holi", limit=10)
+    assert ids == [sunset.id]
+    # Short words fall back to a substring match
+    ids, _ = search_photos(db_session, "car", limit=10)
+    assert ids == [car.id]
+
+
+def test_search_pages_and_follows_changes(db_session):
+    cake, grandma, sunset, car = _seed(db_session)
+
+    first, cursor = search_photos(db_session, "beach", limit=1)
+    second, last = search_photos(db_session, "beach", limit=1,
+                                 cursor=cursor)
+    assert set(first + second) == {grandma.id, sunset.id}
+    assert last is None
+
+    db_session.add(Comment(photo_id=cake.id, user_id=cake.uploader_id,
+                           text="sandy beach cake"))
+    refresh_search(db_session, [cake.id])
+    delete_photos(db_session, [grandma])
+    db_session.commit()
+    ids, _ = search_photos(db_session, "beach", limit=10)
+    assert sorted(ids) == sorted([sunset.id, cake.id])
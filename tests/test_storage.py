@@ -0,0 +1,73 @@
+import asyncio
+import io
+import os
+import threading
+import pytest
+from app.core.storage import (AsyncStorage, get_presigned_upload_url,
+                              EXTERNAL_URL_HOST, BUCKET_NAME)
+from app.core.storage_backends import LocalBackend, ObjectNotFound
+
+
+def test_async_storage_reports_queue_and_in_flight():
+    """With one worker, a blocked call leaves the next one queued."""
+    storage = AsyncStorage(max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_call():
+        started.set()
+        release.wait(timeout=5)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(storage.run(slow_call))
+        second = asyncio.ensure_future(storage.run(lambda: "quick"))
+        await asyncio.get_running_loop().run_in_executor(
+            None, started.wait, 5)
+        busy = storage.stats()
+        release.set()
+        return busy, await first, await second
+
+    busy, first, second = asyncio.run(scenario())
+    storage.shutdown()
+
+    assert busy == {"max_workers": 1, "queued": 1, "in_flight": 1}
+    assert (first, second) == ("done", "quick")
+    assert storage.stats()["in_flight"] == 0
+
+
+def test_presigned_upload_url_targets_external_host():
+    """Presigning is offline and signed for the address phones use."""
+    url = get_presigned_upload_url("direct/1/abc.jpg")
+    assert url.startswith(
+        f"http://{EXTERNAL_URL_HOST}/{BUCKET_NAME}/direct/1/abc.jpg?")
+    assert "X-Amz-Signature=" in url
+
+
+def test_local_backend_round_trip(tmp_path):
+    backend = LocalBackend(str(tmp_path), base_url="/images/")
+    backend.put("objects/ab.jpg", io.BytesIO(b"0123456789"))
+
+    assert backend.get("objects/ab.jpg") == b"0123456789"
+    assert backend.get("objects/ab.jpg", offset=2, length=3) == b"234"
+    assert b"".join(backend.stream("objects/ab.jpg", chunk_size=4)) == \
+        b"0123456789"
+    assert backend.stat("objects/ab.jpg").size == 10
+    assert backend.public_url("objects/ab.jpg") == "/images/objects/ab.jpg"
+    # Only the renamed object is left, no temporary files
+    assert os.listdir(tmp_path / "objects") == ["ab.jpg"]
+
+    assert backend.delete_many(["objects/ab.jpg", "missing.jpg"]) == []
+    with pytest.raises(ObjectNotFound):
+        backend.stat("objects/ab.jpg")
+    with pytest.raises(ValueError):
+        backend.get("../outside.jpg")
+
+
+def test_local_backend_lists_in_global_key_order(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    keys = ["a/b", "a.b", "a0", "a/c/d", "a/c.e", "b", "a-z/x"]
+    for key in keys:
+        backend.put(key, io.BytesIO(b"x"))
+
+    assert [key for key, _ in backend.list_objects()] == sorted(keys)
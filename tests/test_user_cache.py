@@ -0,0 +1,34 @@
+from app.core import user_cache
+from app.core.user_cache import get_principal, invalidate_user
+from app.models.user_models import User
+
+
+def test_principal_is_cached_until_invalidated(db_session):
+    user = User(username="dad", role="parent", display_name="Dad")
+    db_session.add(user)
+    db_session.commit()
+    invalidate_user(user.id)  # ids repeat across test databases
+
+    first = get_principal(db_session, user.id)
+    assert (first.id, first.role, first.display_name) == (
+        user.id, "parent", "Dad")
+
+    # Changed behind the cache's back: still served from memory
+    user.role = "child"
+    db_session.commit()
+    assert get_principal(db_session, user.id) is first
+
+    invalidate_user(user.id)
+    assert get_principal(db_session, user.id).role == "child"
+
+
+def test_principal_expires_and_skips_unknown_ids(db_session, monkeypatch):
+    user = User(username="mum")
+    db_session.add(user)
+    db_session.commit()
+    assert get_principal(db_session, 999) is None
+
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL", 0)
+    invalidate_user(user.id)
+    first = get_principal(db_session, user.id)
+    assert get_principal(db_session, user.id) is not first
@@ -0,0 +1,28 @@
+from app.core.view_buffer import record_views, flush_views, pending_views
+from app.models.photo_model import Photo, View
+from app.models.user_models import User
+
+
+def test_buffered_views_flush_once_per_viewer(db_session):
+    user = User(username="alice")
+    db_session.add(user)
+    db_session.flush()
+    photos = [Photo(minio_key=f"{i}.jpg", uploader_id=user.id)
+              for i in range(3)]
+    db_session.add_all(photos)
+    db_session.commit()
+    ids = [p.id for p in photos]
+
+    record_views(ids, user.id)
+    record_views(ids[:1], user.id)
+    # A photo deleted before the flush must not sink the batch
+    record_views([9999], user.id)
+    assert pending_views() == 4
+
+    assert flush_views(db_session) == 3
+    assert pending_views() == 0
+
+    # Re-viewing after a flush hits ON CONFLICT DO NOTHING
+    record_views(ids, user.id)
+    flush_views(db_session)
+    assert db_session.query(View).count() == 3